@@ -0,0 +1,81 @@
+"""
+Benchmarks the database connections of the daemon: short units of work
+run on a thread pool, like the supervisor does, and the connections
+opened per second are counted with and without persistent connections.
+
+    python benchmarks/db_connections.py --units 2000 --max-age 60
+
+Run it against the configured database (e.g. PostgreSQL) for
+representative numbers, as SQLite connections are nearly free.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+
+import typer
+
+app = typer.Typer()
+
+
+def _benchmark(units: int, pool_size: int, max_age: int):
+    """
+    Runs the units of work, returning the time taken and the number
+    of connections opened
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    from scoach.db import db_session
+    from scoach.models import Status
+
+    for alias in connections:
+        connections[alias].settings_dict["CONN_MAX_AGE"] = max_age
+    created = [0]
+    lock = Lock()
+
+    def _count(**kwargs):  # pylint: disable=unused-argument
+        with lock:
+            created[0] += 1
+
+    @db_session
+    def _unit():
+        return Status.objects.filter(status="queued").exists()
+
+    connection_created.connect(_count, weak=False)
+    try:
+        with ThreadPoolExecutor(pool_size) as pool:
+            start = perf_counter()
+            for future in [pool.submit(_unit) for _ in range(units)]:
+                future.result()
+            elapsed = perf_counter() - start
+            # Close the persistent connections of the pool threads
+            for future in [pool.submit(connections.close_all) for _ in range(pool_size)]:
+                future.result()
+    finally:
+        connection_created.disconnect(_count)
+    return elapsed, created[0]
+
+
+@app.command()
+def main(
+    units: int = typer.Option(1000, help="Units of work to run"),
+    pool_size: int = typer.Option(4, help="Threads of the pool"),
+    max_age: int = typer.Option(60, help="DB_CONN_MAX_AGE of persistent connections"),
+):
+    # pylint: disable=import-outside-toplevel
+    from scoach.utils import setup_django
+    setup_django()
+    typer.echo(
+        f"{'max age (s)':<14}{'time (s)':>10}{'connections':>13}"
+        f"{'connections/s':>15}{'units/s':>10}")
+    for age in (0, max_age):
+        elapsed, created = _benchmark(units, pool_size, age)
+        typer.echo(
+            f"{age:<14}{elapsed:>10.2f}{created:>13}"
+            f"{created / elapsed:>15.1f}{units / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,195 @@
+"""
+Benchmarks the hot queries on runs (claiming, listing, leaderboards,
+lookups by id) against a large fixture, with and without the indexes
+of Run.
+
+    python benchmarks/run_queries.py --runs 1000000
+    python benchmarks/run_queries.py --no-create --compare
+    python benchmarks/run_queries.py --no-create --cleanup
+
+The fixture is created in the configured database and marked so it can
+be removed with --cleanup. Run it against PostgreSQL for representative
+numbers.
+"""
+
+import json
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from statistics import median
+from time import perf_counter
+
+import typer
+
+app = typer.Typer()
+
+FIXTURE_DESCRIPTION = "benchmarks/run_queries.py"
+BATCH_SIZE = 10000
+
+
+@contextmanager
+def _explicit_dates(model):
+    """
+    Lets the fixture set the creation dates itself
+    """
+    field = model._meta.get_field("date_created")  # pylint: disable=protected-access
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _create_fixture(runs: int, tags: int):
+    # pylint: disable=import-outside-toplevel
+    from django.db import transaction
+    from django.utils import timezone
+    from scoach.constants import constants
+    from scoach.models import Model, Parameters, Run, Script, Tag
+    from scoach.runs import get_status_id
+    from scoach.utils import bulk_create_with_ids
+
+    rng = random.Random(0)
+    model = Model.objects.create(config=json.dumps({}), description=FIXTURE_DESCRIPTION)
+    script = Script.objects.create(path=FIXTURE_DESCRIPTION, description=FIXTURE_DESCRIPTION)
+    parameters = Parameters.objects.create(config=json.dumps({}), description=FIXTURE_DESCRIPTION)
+    # Most runs are long finished, a few are pending
+    statuses = [
+        (get_status_id(constants.RUN_STATUS_COMPLETED.value), 0.8),
+        (get_status_id(constants.RUN_STATUS_FAILED.value), 0.15),
+        (get_status_id(constants.RUN_STATUS_CREATED.value), 0.05),
+    ]
+    tag_objs = [
+        Tag.objects.get_or_create(name=f"benchmark-{i}")[0] for i in range(tags)]
+    start = timezone.now() - timedelta(days=365)
+    with _explicit_dates(Run):
+        for offset in range(0, runs, BATCH_SIZE):
+            with transaction.atomic():
+                created = bulk_create_with_ids(Run, [
+                    Run(
+                        model=model,
+                        script=script,
+                        parameters=parameters,
+                        status_id=rng.choices(
+                            [status for status, _ in statuses],
+                            [weight for _, weight in statuses])[0],
+                        priority=rng.randint(0, 3),
+                        validation_score=rng.random(),
+                        date_created=start + timedelta(seconds=31536000 * i / runs),
+                        description=FIXTURE_DESCRIPTION,
+                    )
+                    for i in range(offset, min(offset + BATCH_SIZE, runs))
+                ])
+                if tag_objs:
+                    Run.tags.through.objects.bulk_create([
+                        Run.tags.through(run_id=run.id, tag_id=rng.choice(tag_objs).id)
+                        for run in created
+                    ])
+            typer.echo(f"Created {offset + len(created):,} runs", err=True)
+
+
+def _cleanup():
+    # pylint: disable=import-outside-toplevel
+    from scoach.models import Model, Parameters, Script, Tag
+    # Runs are deleted along with their model
+    for T in (Model, Script, Parameters):
+        T.objects.filter(description=FIXTURE_DESCRIPTION).delete()
+    Tag.objects.filter(name__startswith="benchmark-").delete()
+
+
+def _queries():
+    # pylint: disable=import-outside-toplevel
+    from django.utils import timezone
+    from scoach.constants import constants
+    from scoach.models import Run
+    from scoach.runs import filter_runs, get_status_id
+    from scoach.utils import iter_keyset
+
+    created = get_status_id(constants.RUN_STATUS_CREATED.value)
+    last_id = Run.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    return {
+        # What claim_runs selects, without moving the runs
+        "claim": lambda: [*Run.objects.filter(status_id=created).order_by(
+            "-priority", "date_created", "id").values_list("id", "priority")[
+                :constants.SCHEDULER_CLAIM_BATCH_SIZE.value]],
+        "list by status": lambda: [*iter_keyset(
+            filter_runs(status=constants.RUN_STATUS_FAILED.value), limit=50)],
+        "list last week": lambda: [*iter_keyset(
+            filter_runs(
+                status=constants.RUN_STATUS_COMPLETED.value,
+                since=timezone.now() - timedelta(days=7)),
+            limit=50)],
+        "list by tag": lambda: [*iter_keyset(filter_runs(tags=["benchmark-0"]), limit=50)],
+        "leaderboard": lambda: [*Run.objects.filter(validation_score__isnull=False)
+                                .order_by("-validation_score")[:10]],
+        "get by id": lambda: Run.objects.filter(
+            id=random.randint(1, max(last_id, 1))).first(),
+    }
+
+
+def _measure(repeats: int) -> dict:
+    timings = {}
+    for name, query in _queries().items():
+        # Warm up the cache first
+        query()
+        samples = []
+        for _ in range(repeats):
+            start = perf_counter()
+            query()
+            samples.append(perf_counter() - start)
+        timings[name] = median(samples)
+    return timings
+
+
+@contextmanager
+def _without_indexes():
+    """
+    Drops the indexes of Run while measuring
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.db import connection
+    from scoach.models import Run
+    indexes = Run._meta.indexes  # pylint: disable=protected-access
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(Run, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Run, index)
+
+
+@app.command()
+def main(
+    runs: int = typer.Option(1000000, help="Runs in the fixture"),
+    tags: int = typer.Option(20, help="Distinct tags in the fixture"),
+    create: bool = typer.Option(True, help="Create the fixture first"),
+    compare: bool = typer.Option(False, help="Also measure without the indexes of Run"),
+    repeats: int = typer.Option(20, help="Repetitions of each query"),
+    cleanup: bool = typer.Option(False, help="Remove the fixture and exit"),
+):
+    # pylint: disable=import-outside-toplevel
+    from scoach.utils import setup_django
+    setup_django()
+    if cleanup:
+        _cleanup()
+        return
+    if create:
+        _create_fixture(runs, tags)
+    timings = _measure(repeats)
+    if compare:
+        with _without_indexes():
+            unindexed = _measure(repeats)
+        typer.echo(f"{'query':<18}{'indexed (ms)':>14}{'unindexed (ms)':>16}")
+        for name, elapsed in timings.items():
+            typer.echo(f"{name:<18}{elapsed * 1e3:>14.2f}{unindexed[name] * 1e3:>16.2f}")
+    else:
+        typer.echo(f"{'query':<18}{'indexed (ms)':>14}")
+        for name, elapsed in timings.items():
+            typer.echo(f"{name:<18}{elapsed * 1e3:>14.2f}")
+
+
+if __name__ == "__main__":
+    app()
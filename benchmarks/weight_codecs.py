@@ -0,0 +1,107 @@
+"""
+Benchmarks the weights codecs of save_run: stored size, encoding and
+decoding time, and transfer time, either estimated for a given bandwidth
+or measured against the configured MinIO.
+
+    python benchmarks/weight_codecs.py --width 2048 --depth 8
+    python benchmarks/weight_codecs.py --model model.json --weights weights.h5 --minio
+
+Randomly initialized weights compress much worse than trained ones, so
+pass the weights of a real run for representative zstd numbers.
+"""
+
+import os
+import tempfile
+from os.path import join
+from time import perf_counter
+
+import typer
+
+from scoach.weight_codecs import CODECS, load_weights, save_weights
+
+app = typer.Typer()
+
+
+def _build_model(width: int, depth: int, model_path: str, weights_path: str):
+    # pylint: disable=import-outside-toplevel
+    import tensorflow as tf
+    if model_path:
+        with open(model_path, "r") as f:  # pylint: disable=unspecified-encoding
+            model = tf.keras.models.model_from_json(f.read())
+        if weights_path:
+            model.load_weights(weights_path)
+        return model
+    model = tf.keras.Sequential(
+        [tf.keras.layers.InputLayer(input_shape=(width,))]
+        + [tf.keras.layers.Dense(width) for _ in range(depth)]
+    )
+    return model
+
+
+def _round_trip(path: str) -> float:
+    """
+    Uploads and downloads a file through MinIO, returning the time taken
+    """
+    # pylint: disable=import-outside-toplevel
+    from scoach.utils import (
+        download_from_minio,
+        get_minio_client,
+        load_config_file_to_envs,
+        save_to_minio,
+    )
+    load_config_file_to_envs()
+    minio_client = get_minio_client()
+    object_name = join("benchmarks", os.path.basename(path))
+    start = perf_counter()
+    save_to_minio(minio_client, object_name, path)
+    download_from_minio(minio_client, object_name, path + ".download")
+    elapsed = perf_counter() - start
+    os.remove(path + ".download")
+    return elapsed
+
+
+@app.command()
+def main(
+    width: int = typer.Option(1024, help="Units of each dense layer"),
+    depth: int = typer.Option(8, help="Number of dense layers"),
+    model: str = typer.Option(None, help="Model JSON to benchmark instead"),
+    weights: str = typer.Option(None, help="Weights (.h5) of the model JSON"),
+    bandwidth: float = typer.Option(100.0, help="Bandwidth for estimates, in MB/s"),
+    minio: bool = typer.Option(False, help="Measure round trips to MinIO"),
+):
+    keras_model = _build_model(width, depth, model, weights)
+    typer.echo(f"{keras_model.count_params():,} parameters")
+    original_weights = keras_model.get_weights()
+    typer.echo(
+        f"{'codec':<10}{'size (MB)':>12}{'ratio':>8}{'save (s)':>10}"
+        f"{'load (s)':>10}{'transfer (s)':>14}")
+    baseline = None
+    with tempfile.TemporaryDirectory(prefix="scoach-") as tmp_dir:
+        for name, codec in CODECS.items():
+            path = join(tmp_dir, f"weights.{codec.extension}")
+            try:
+                start = perf_counter()
+                save_weights(keras_model, path, name)
+                save_time = perf_counter() - start
+                start = perf_counter()
+                load_weights(keras_model, path, name)
+                load_time = perf_counter() - start
+                # Reduced precision codecs are lossy
+                keras_model.set_weights(original_weights)
+            except ImportError as e:
+                typer.echo(f"{name:<10}skipped: {e}")
+                continue
+            size = os.path.getsize(path)
+            baseline = baseline or size
+            if minio:
+                transfer_time = _round_trip(path)
+            else:
+                # Upload and download
+                transfer_time = 2 * size / (bandwidth * 1e6)
+            typer.echo(
+                f"{name:<10}{size / 1e6:>12.1f}{baseline / size:>8.2f}"
+                f"{save_time:>10.2f}{load_time:>10.2f}{transfer_time:>14.2f}")
+
+
+if __name__ == "__main__":
+    app()
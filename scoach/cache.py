@@ -0,0 +1,185 @@
+"""
+Provides WeightsCache, an on-disk LRU cache for the weights downloaded
+from MinIO, shared by every scoach process of the user.
+"""
+
+import os
+import fcntl
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator
+
+from scoach.config import get_config
+from scoach.constants import constants
+
+
+class WeightsCache:
+    """
+    On-disk LRU cache for weights. Keys must identify the weights across
+    every database sharing the cache (see `weights_cache_key`) and can't
+    contain dots, which separate them from the extension of the codec.
+
+    Entries are immutable, as saving a run always creates new Weights.
+    Processes coordinate with file locks: an entry is locked exclusively
+    while it's downloaded and shared while it's read, and entries in use
+    are never evicted. Evicted entries take their lock files with them.
+    """
+
+    def __init__(self, directory: Path = constants.SCOACH_WEIGHTS_CACHE_PATH.value, max_size: int = None):
+        self._directory = Path(directory)
+        self._max_size = max_size
+
+    @property
+    def max_size(self) -> int:
+        """
+        The maximum size of the cache, in bytes
+        """
+        if self._max_size is not None:
+            return self._max_size
+        return get_config().scoach_weights_cache_size
+
+    def _entry_path(self, key: str, extension: str) -> Path:
+        return self._directory / f"{key}.{extension}"
+
+    def _lock_path(self, key: str) -> Path:
+        return self._directory / f"{key}.lock"
+
+    def _entries(self) -> Iterator[Path]:
+        for path in self._directory.iterdir():
+            if path.name.startswith(".") or path.suffix in (".lock", ".part"):
+                continue
+            yield path
+
+    def _is_current(self, lock: IO, key: str) -> bool:
+        """
+        Whether a lock is held on the lock file currently at its path,
+        and not on one removed by an eviction
+        """
+        try:
+            return os.stat(self._lock_path(key)).st_ino == os.fstat(lock.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def _locked(self, key: str, operation: int) -> Iterator[IO]:
+        """
+        Locks an entry with the given flock operation. The lock file may
+        be removed by an eviction while we wait for it, so the lock is only
+        taken once it's held on the file currently at its path.
+        """
+        while True:
+            lock = open(self._lock_path(key), "a")  # pylint: disable=unspecified-encoding,consider-using-with
+            try:
+                fcntl.flock(lock, operation)
+                current = self._is_current(lock, key)
+            except BaseException:
+                lock.close()
+                raise
+            if current:
+                break
+            lock.close()
+        with lock:
+            yield lock
+
+    def _fetch(self, lock: IO, key: str, path: Path, fetch: Callable[[str], None]):
+        """
+        Fetches a missing entry while holding its lock exclusively, then
+        shares the lock again
+        """
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Another process may have fetched it while we waited
+            if self._is_current(lock, key) and not path.exists():
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=self._directory, suffix=".part")
+                os.close(fd)
+                try:
+                    fetch(tmp_path)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+
+    @contextmanager
+    def open(self, key: str, fetch: Callable[[str], None], extension: str = "h5") -> Iterator[str]:
+        """
+        Gets the path of a cached entry, fetching it on a miss. The entry
+        is kept while the context is active.
+
+        Args:
+            - key (str): the key of the weights
+            - fetch (callable): downloads the weights to the given path
+            - extension (str): the extension of the codec of the weights
+
+        Yields:
+            - str: the path of the cached weights
+        """
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key, extension)
+        while True:
+            with self._locked(key, fcntl.LOCK_SH) as lock:
+                if not path.exists():
+                    self._fetch(lock, key, path, fetch)
+                # Converting a flock isn't atomic, so an eviction may
+                # have come in between
+                if self._is_current(lock, key) and path.exists():
+                    # Mark as recently used
+                    os.utime(path)
+                    yield str(path)
+                    break
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries that aren't in use
+        until the cache fits its maximum size
+        """
+        max_size = self.max_size
+        with open(self._directory / ".lock", "a") as lock:  # pylint: disable=unspecified-encoding
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            for path in self._entries():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            size = sum(entry_size for _, entry_size, _ in entries)
+            for _, entry_size, path in sorted(entries):
+                if size <= max_size:
+                    break
+                lock_path = self._lock_path(path.name.split(".", 1)[0])
+                with open(lock_path, "a") as entry_lock:  # pylint: disable=unspecified-encoding
+                    try:
+                        fcntl.flock(entry_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # In use by another load
+                        continue
+                    path.unlink(missing_ok=True)
+                    # Loads waiting on this lock notice it's gone and retry
+                    lock_path.unlink(missing_ok=True)
+                    size -= entry_size
+
+
+def weights_cache_key(weights_id: Any) -> str:
+    """
+    Gets the cache key of some weights, which tells apart the weights of
+    different databases sharing the cache
+
+    Args:
+        - weights_id: the id of the weights
+
+    Returns:
+        - str: the key of the weights in the cache
+    """
+    from django.db import connection  # pylint: disable=import-outside-toplevel
+    database = connection.settings_dict
+    identity = f"{database['ENGINE']}:{database['HOST']}:{database['PORT']}/{database['NAME']}"
+    return f"{hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]}-{weights_id}"
+
+
+weights_cache = WeightsCache()
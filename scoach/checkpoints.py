@@ -0,0 +1,170 @@
+"""
+Provides save_checkpoint and load_checkpoint, used by training scripts to
+store their progress incrementally and to resume from it when retried.
+"""
+
+import shutil
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from os.path import basename, join
+from threading import Lock
+from typing import Any, Optional, Tuple
+
+from scoach.config import get_config
+from scoach.constants import constants
+from scoach.logging import logger
+from scoach.utils import (
+    download_from_minio,
+    get_minio_client,
+    save_to_minio,
+)
+
+
+# A single uploader keeps checkpoints in order
+_uploader = ThreadPoolExecutor(1, thread_name_prefix="scoach-checkpoints")
+_pending: Optional[Future] = None
+_pending_lock = Lock()
+# Runs that saved or loaded checkpoints in this process
+_checkpointed_runs: set = set()
+
+
+def _checkpoints_prefix(run_id: Any) -> str:
+    return join(constants.CHECKPOINTS_PATH_PREFIX.value, str(run_id)) + "/"
+
+
+def _checkpoint_path(run_id: Any, step: int) -> str:
+    return join(_checkpoints_prefix(run_id), f"{step:010d}.h5")
+
+
+def _bucket() -> str:
+    return get_config().minio_bucket
+
+
+def _list_checkpoints(minio_client, run_id: Any) -> list:
+    """
+    Lists the object names of the checkpoints of a run, oldest first
+    """
+    return sorted(
+        obj.object_name
+        for obj in minio_client.list_objects(_bucket(), prefix=_checkpoints_prefix(run_id))
+    )
+
+
+def _upload(run_id: Any, step: int, tmp_dir: str, tmp_weights_file: str, keep: int):
+    """
+    Uploads a checkpoint and removes the ones that are no longer kept
+    """
+    try:
+        minio_client = get_minio_client()
+        save_to_minio(minio_client, _checkpoint_path(run_id, step), tmp_weights_file)
+        for object_name in _list_checkpoints(minio_client, run_id)[:-keep]:
+            minio_client.remove_object(_bucket(), object_name)
+    except Exception as e:  # pylint: disable=broad-except
+        # Training goes on, the next checkpoint may succeed
+        logger.warning(f"Could not upload checkpoint {step} of run #{run_id}: {e}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _cleanup_cancelled(tmp_dir: str, future: Future):
+    """
+    Removes the weights of a superseded checkpoint, which is never uploaded
+    """
+    if future.cancelled():
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def save_checkpoint(run_id: Any, model, step: int, keep: int = constants.CHECKPOINTS_KEEP.value) -> Future:
+    """
+    Saves a checkpoint of a run, uploading it in the background so the
+    training loop isn't blocked. Only the weights are written before
+    returning. A checkpoint still waiting for its upload is superseded
+    by a newer one.
+
+    Args:
+        - run_id: the id of the run
+        - model: the model to checkpoint
+        - step (int): the training step (e.g. the epoch) of the checkpoint
+        - keep (int): how many of the latest checkpoints to keep
+
+    Returns:
+        - Future: completes once the checkpoint is uploaded
+    """
+    global _pending  # pylint: disable=global-statement
+    if keep < 1:
+        raise ValueError("At least one checkpoint must be kept")
+    tmp_dir = tempfile.mkdtemp(prefix="scoach-")
+    tmp_weights_file = join(tmp_dir, f"{step:010d}.h5")
+    try:
+        model.save_weights(tmp_weights_file)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _checkpointed_runs.add(str(run_id))
+    with _pending_lock:
+        if _pending is not None and _pending.cancel():
+            logger.info(f"Checkpoint of run #{run_id} superseded by step {step}")
+        _pending = _uploader.submit(
+            _upload, run_id, step, tmp_dir, tmp_weights_file, keep)
+        _pending.add_done_callback(partial(_cleanup_cancelled, tmp_dir))
+        return _pending
+
+
+def wait_for_checkpoints():
+    """
+    Blocks until every checkpoint submitted so far is uploaded
+    """
+    with _pending_lock:
+        pending = _pending
+    if pending is not None and not pending.cancelled():
+        pending.result()
+
+
+def latest_checkpoint(run_id: Any) -> Optional[Tuple[int, str]]:
+    """
+    Finds the latest checkpoint of a run
+
+    Returns:
+        - tuple: the step and the object name of the checkpoint,
+            or None if the run has no checkpoints
+    """
+    checkpoints = _list_checkpoints(get_minio_client(), run_id)
+    if not checkpoints:
+        return None
+    return int(basename(checkpoints[-1]).split(".")[0]), checkpoints[-1]
+
+
+def load_checkpoint(run_id: Any, model) -> Optional[int]:
+    """
+    Loads the latest checkpoint of a run into a model, so a retried
+    run resumes where it left off
+
+    Returns:
+        - int: the step of the checkpoint, or None if there was none
+    """
+    checkpoint = latest_checkpoint(run_id)
+    if checkpoint is None:
+        return None
+    step, object_name = checkpoint
+    with tempfile.TemporaryDirectory(prefix="scoach-") as tmp_dir:
+        tmp_weights_file = join(tmp_dir, basename(object_name))
+        download_from_minio(get_minio_client(), object_name, tmp_weights_file)
+        model.load_weights(tmp_weights_file)
+    _checkpointed_runs.add(str(run_id))
+    logger.info(f"Run #{run_id} resumed from checkpoint {step}")
+    return step
+
+
+def remove_checkpoints(run_id: Any):
+    """
+    Removes the checkpoints of a run once its results are stored. Only
+    runs that saved or loaded checkpoints in this process have any.
+    """
+    if str(run_id) not in _checkpointed_runs:
+        return
+    wait_for_checkpoints()
+    minio_client = get_minio_client()
+    for object_name in _list_checkpoints(minio_client, run_id):
+        minio_client.remove_object(_bucket(), object_name)
+    _checkpointed_runs.discard(str(run_id))
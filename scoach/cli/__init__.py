@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 
 import yaml
@@ -9,8 +10,8 @@ from scoach.cli.utils import (
     check_config,
     check_database_exists,
     check_minio_connection,
+    profile_imports,
 )
-from scoach.scoach import Scoach
 from scoach.constants import constants
 from scoach.logging import logger
 from scoach.utils import setup_database
@@ -20,6 +21,19 @@ app.add_typer(run.app, name="run", help="Manages runs")
 app.add_typer(script.app, name="script", help="Manages scripts")
 
 
+@app.callback()
+def main(
+    profile_import: bool = typer.Option(
+        False, "--profile-import", help="Report the slowest imports of the command"),
+):
+    """
+    Trains Tensorflow models on SLURM clusters
+    """
+    if profile_import:
+        argv = [arg for arg in sys.argv[1:] if arg != "--profile-import"]
+        raise typer.Exit(profile_imports(argv))
+
+
 @app.command()
 def version():
     """
@@ -140,6 +154,17 @@ def init():  # pylint: disable=too-many-locals
     setup_database()
 
 
+@app.command()
+@logger.catch
+def migrate():
+    """
+    Applies pending database migrations after upgrading scoach.
+    """
+    if not check_config():
+        return
+    setup_database()
+
+
 @app.command()
 @logger.catch
 def start(local: bool = typer.Option(False, help="Run on local Dask Executor")):
@@ -149,6 +174,8 @@ def start(local: bool = typer.Option(False, help="Run on local Dask Executor")):
     if not check_config():
         return
 
+    # The daemon stack (Prefect, Dask) is only needed here
+    from scoach.scoach import Scoach  # pylint: disable=import-outside-toplevel
     typer.echo("Starting scoach daemon process...")
     scoach = Scoach(local=local)
     scoach.start_scheduler()
@@ -3,19 +3,20 @@ Provides CLI app for scoach.
 """
 
 import json
+from datetime import datetime
 from typing import List
-import uuid
 from pathlib import Path
-from os.path import join
 
 import typer
 
 from scoach.cli.utils import check_config
 from scoach.constants import constants
 from scoach.logging import logger
+from scoach.notifier import notify_new_runs
 from scoach.utils import (
-    get_minio_client,
-    save_to_minio,
+    get_or_create_config,
+    get_or_upload_script,
+    iter_keyset,
     safe_object_get
 )
 
@@ -24,13 +25,20 @@ app = typer.Typer()
 
 @app.command()
 @logger.catch
-def submit(python_script: Path, job_config: Path, model_config: Path, tags: List[str] = None):
+def submit(
+    python_script: Path,
+    job_config: Path,
+    model_config: Path,
+    tags: List[str] = None,
+    priority: int = typer.Option(0, help="Runs with higher priority are dispatched first"),
+):
     """
     Submits a job to the queue.
     """
     if not check_config():
         return
-    from scoach.models import Script, Parameters, Model, Status, Run, Tag
+    from scoach.models import Script, Parameters, Model, Run, Tag
+    from scoach.runs import get_status_id
     # Check if all paths exists
     if not python_script.exists():
         script: Script = safe_object_get(Script, id=str(python_script))
@@ -40,18 +48,7 @@ def submit(python_script: Path, job_config: Path, model_config: Path, tags: List
             )
             return
     else:
-        script_id = str(uuid.uuid4())
-        minio_script_path = join(
-            constants.SCRIPTS_PATH_PREFIX.value,
-            script_id,
-            str(python_script).split("/")[-1],
-        )
-        script: Script = Script.objects.create(
-            path=minio_script_path
-        )
-        save_to_minio(get_minio_client(),
-                      minio_script_path, str(python_script))
-        script.save()
+        script: Script = get_or_upload_script(str(python_script))
     if not job_config.exists():
         typer.echo("Job config does not exist.")
         return
@@ -62,58 +59,120 @@ def submit(python_script: Path, job_config: Path, model_config: Path, tags: List
     # pylint: disable=invalid-name
     with job_config.open() as f:
         job_config = json.load(f)
-    parameters: Parameters = safe_object_get(
-        Parameters, config=json.dumps(job_config))
-    if parameters is None:
-        parameters = Parameters.objects.create(config=json.dumps(job_config))
-        parameters.save()
+    parameters: Parameters = get_or_create_config(Parameters, job_config)
     # Load model_config json
     # pylint: disable=invalid-name
     with model_config.open() as f:
         model_config = json.load(f)
-    model: Model = safe_object_get(Model, config=json.dumps(model_config))
-    if model is None:
-        model = Model.objects.create(config=json.dumps(model_config))
-    model.save()
+    model: Model = get_or_create_config(Model, model_config)
     # Submit job
-    status: Status = safe_object_get(
-        Status, status=constants.RUN_STATUS_CREATED.value)
-    if status is None:
-        status = Status.objects.create(
-            status=constants.RUN_STATUS_CREATED.value)
-        status.save()
     run: Run = Run.objects.create(
         model=model,
         script=script,
         parameters=parameters,
-        status=status,
+        status_id=get_status_id(constants.RUN_STATUS_CREATED.value),
+        priority=priority,
     )
     run.save()
     if tags is not None:
         for tag in tags:
-            tag_obj: Tag = safe_object_get(Tag, name=tag)
-            if tag_obj is None:
-                tag_obj: Tag = Tag.objects.create(name=tag)
-                tag_obj.save()
+            tag_obj: Tag = Tag.objects.get_or_create(name=tag)[0]
             run.tags.add(tag_obj)
         run.save()
+    notify_new_runs()
     typer.echo(f"Submitted run with id {run.id}")
 
 
+@app.command()
+@logger.catch
+def sweep(
+    python_script: Path,
+    job_config: Path,
+    model_config: Path,
+    grid_axes: Path = typer.Option(
+        None, "--grid", help="JSON file mapping parameters to the lists of values to combine"),
+    random_axes: Path = typer.Option(
+        None, "--random", help="JSON file mapping parameters to the values or distributions to sample from"),
+    samples: int = typer.Option(10, help="Number of configs drawn by a random search"),
+    seed: int = typer.Option(None, help="Seed for reproducible random searches"),
+    tags: List[str] = None,
+    priority: int = typer.Option(0, help="Runs with higher priority are dispatched first"),
+):
+    """
+    Submits a grid or random search over a base job config.
+    """
+    if not check_config():
+        return
+    from scoach.models import Script
+    from scoach.sweep import create_runs, grid_configs, random_configs
+    if (grid_axes is None) == (random_axes is None):
+        typer.echo("Please provide either --grid or --random.")
+        return
+    axes_path = grid_axes or random_axes
+    # Check if all paths exists
+    for path, name in ((job_config, "Job config"), (model_config, "Model config"), (axes_path, "Sweep axes")):
+        if not path.exists():
+            typer.echo(f"{name} does not exist.")
+            return
+    # pylint: disable=invalid-name
+    with job_config.open() as f:
+        base_config = json.load(f)
+    with model_config.open() as f:
+        model_config = json.load(f)
+    with axes_path.open() as f:
+        axes = json.load(f)
+    # Expanded first, so invalid or empty sweeps upload no script
+    if grid_axes is not None:
+        configs = grid_configs(base_config, axes)
+    else:
+        configs = random_configs(base_config, axes, samples, seed)
+    if not configs:
+        typer.echo("The sweep has no configs, no runs were submitted.")
+        return
+    if not python_script.exists():
+        script: Script = safe_object_get(Script, id=str(python_script))
+        if script is None:
+            typer.echo(
+                "Python script does not exist locally and was not found on database."
+            )
+            return
+    else:
+        script: Script = get_or_upload_script(str(python_script))
+    runs = create_runs(script, model_config, configs,
+                       tags=tags, priority=priority)
+    typer.echo(
+        f"Submitted {len(runs)} runs with ids {runs[0].id} to {runs[-1].id}")
+
+
 # pylint: disable=redefined-builtin
+# pylint: disable=too-many-arguments
 @app.command()
 @logger.catch
-def list():
+def list(
+    status: str = typer.Option(None, help="Only runs with this status"),
+    tags: List[str] = typer.Option(None, "--tag", help="Only runs with this tag (repeatable)"),
+    since: datetime = typer.Option(None, help="Only runs created at or after this date"),
+    until: datetime = typer.Option(None, help="Only runs created before this date"),
+    min_score: float = typer.Option(None, help="Minimum validation score"),
+    max_score: float = typer.Option(None, help="Maximum validation score"),
+    limit: int = typer.Option(None, help="Maximum number of runs to list"),
+    offset: int = typer.Option(0, help="Number of runs to skip"),
+    after: int = typer.Option(None, help="Only runs with a greater id (for paging)"),
+):
     """
     List all jobs.
     """
     if not check_config():
         return
-    from scoach.models import Run
-    runs = Run.objects.all()
-    typer.echo(f"Found {len(runs)} runs.")
-    for run in runs:
+    from scoach.runs import filter_runs
+    runs = filter_runs(status, tags, since, until, min_score, max_score)
+    typer.echo(f"Found {runs.count()} runs.")
+    last_id = None
+    for run in iter_keyset(runs, after_id=after, offset=offset, limit=limit):
         typer.echo(f"  - {run}")
+        last_id = run.id
+    if limit is not None and last_id is not None:
+        typer.echo(f"Next page: --after {last_id}")
 
 
 @app.command()
@@ -155,6 +214,7 @@ def describe(run_id: str):
         return
     typer.echo(f"Run #{run_id}")
     typer.echo(f"  - Status: {run.status}")
+    typer.echo(f"  - Priority: {run.priority}")
     typer.echo(f"  - Train score: {run.train_score}")
     typer.echo(f"  - Validation score: {run.validation_score}")
     typer.echo(f"  - Created at: {run.date_created}")
@@ -179,20 +239,18 @@ def retry(run_id: str):
     """
     if not check_config():
         return
-    from scoach.models import Status, Run
-    run: Run = safe_object_get(Run, id=run_id)
-    if run is None:
+    from django.db.models import F
+    from scoach.models import Run
+    from scoach.runs import transition_run
+    if transition_run(
+        run_id,
+        constants.RUN_STATUS_CREATED.value,
+        from_statuses=[constants.RUN_STATUS_FAILED.value],
+        retries=F("retries") + 1,
+    ):
+        notify_new_runs()
+        typer.echo(f"Run {run_id} retried!")
+    elif safe_object_get(Run, id=run_id) is None:
         typer.echo(f"Run {run_id} not found.")
-        return
-    if run.status.status != constants.RUN_STATUS_FAILED.value:
+    else:
         typer.echo(f"Run {run_id} is not in failed status.")
-        return
-    status: Status = safe_object_get(
-        Status, status=constants.RUN_STATUS_CREATED.value)
-    if status is None:
-        status = Status.objects.create(
-            status=constants.RUN_STATUS_CREATED.value)
-        status.save()
-    run.status = status
-    run.save()
-    typer.echo(f"Run {run_id} retried!")
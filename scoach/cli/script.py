@@ -7,6 +7,7 @@ from scoach.utils import (
     safe_object_get,
     get_minio_client,
     download_from_minio,
+    iter_keyset,
 )
 
 app = typer.Typer()
@@ -14,7 +15,11 @@ app = typer.Typer()
 
 @app.command()
 @logger.catch
-def list():
+def list(
+    limit: int = typer.Option(None, help="Maximum number of scripts to list"),
+    offset: int = typer.Option(0, help="Number of scripts to skip"),
+    after: int = typer.Option(None, help="Only scripts with a greater id (for paging)"),
+):
     """
     List all scripts in the database.
     """
@@ -22,12 +27,17 @@ def list():
         return
     from scoach.models import Script
     scripts = Script.objects.all()
-    if len(scripts) == 0:
+    total = scripts.count()
+    if total == 0:
         typer.echo("No scripts found.")
         return
-    typer.echo(f"Found {len(scripts)} scripts.")
-    for script in scripts:
+    typer.echo(f"Found {total} scripts.")
+    last_id = None
+    for script in iter_keyset(scripts, after_id=after, offset=offset, limit=limit):
         typer.echo(f"  - {script}")
+        last_id = script.id
+    if limit is not None and last_id is not None:
+        typer.echo(f"Next page: --after {last_id}")
 
 
 @app.command()
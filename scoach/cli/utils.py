@@ -1,8 +1,9 @@
+import re
+import subprocess
+import sys
 from sys import exit
 
-import minio
 import typer
-import psycopg2
 
 from scoach.constants import constants
 from scoach.utils import load_config_file_to_envs
@@ -25,6 +26,7 @@ def check_database_exists(db_host: str, db_port: str, db_user: str, db_password:
     """
     Check if the database exists.
     """
+    import psycopg2  # pylint: disable=import-outside-toplevel
     try:
         conn = psycopg2.connect(
             host=db_host,
@@ -43,6 +45,7 @@ def check_minio_connection(minio_host: str, minio_access_key: str, minio_secret_
     """
     Check if the minio connection works.
     """
+    import minio  # pylint: disable=import-outside-toplevel
     try:
         minio_client = minio.Minio(
             minio_host,
@@ -55,3 +58,38 @@ def check_minio_connection(minio_host: str, minio_access_key: str, minio_secret_
     except Exception as e:
         typer.echo(f"Error: {e}")
         return False
+
+
+def profile_imports(argv: list, top: int = 20) -> int:
+    """
+    Runs the CLI again with `-X importtime` and reports the packages
+    whose imports take the longest.
+
+    Returns:
+        - int: the exit code of the profiled command
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         "from scoach.cli import app; app(prog_name='scoach')", *argv],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=False,
+    )
+    pattern = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)$")
+    packages = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time: self"):
+            continue
+        match = pattern.match(line)
+        if match is None:
+            # Not part of the profile
+            typer.echo(line, err=True)
+            continue
+        own_time, module = match.groups()
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own_time)
+    total = sum(packages.values())
+    typer.echo(f"Imports took {total / 1000:.0f} ms. Slowest packages:", err=True)
+    for package, own_time in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        typer.echo(f"  {own_time / 1000:>8.1f} ms  {package}", err=True)
+    return process.returncode
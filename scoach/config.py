@@ -0,0 +1,172 @@
+"""
+Provides Config, the typed settings of scoach, and get_config, which
+parses the config file once per process and reloads it only when the
+file changes.
+"""
+
+import os
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import yaml
+
+from scoach.constants import constants
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass(frozen=True)
+class Config:
+    """
+    Settings of scoach. Every field is named after its key in the
+    config file (or its environment variable), in lower case.
+    """
+
+    db_host: Optional[str] = constants.DB_HOST_ENV_DEFAULT.value
+    db_port: int = constants.DB_PORT_ENV_DEFAULT.value
+    db_user: Optional[str] = constants.DB_USER_ENV_DEFAULT.value
+    db_password: Optional[str] = constants.DB_PASSWORD_ENV_DEFAULT.value
+    db_name: Optional[str] = constants.DB_NAME_ENV_DEFAULT.value
+    db_conn_max_age: int = constants.DB_CONN_MAX_AGE_ENV_DEFAULT.value
+    db_conn_health_checks: bool = constants.DB_CONN_HEALTH_CHECKS_ENV_DEFAULT.value
+    db_pool_size: int = constants.DB_POOL_SIZE_ENV_DEFAULT.value
+    slurm_partition: Optional[str] = constants.SLURM_PARTITION_ENV_DEFAULT.value
+    slurm_cores_per_job: int = constants.SLURM_CORES_PER_JOB_ENV_DEFAULT.value
+    slurm_memory_per_job: Optional[str] = constants.SLURM_MEMORY_PER_JOB_ENV_DEFAULT.value
+    slurm_worker_name: Optional[str] = constants.SLURM_WORKER_NAME_ENV_DEFAULT.value
+    slurm_job_exclusive: bool = constants.SLURM_JOB_EXCLUSIVE_ENV_DEFAULT.value
+    slurm_max_workers: int = constants.SLURM_MAX_WORKERS_ENV_DEFAULT.value
+    minio_endpoint: Optional[str] = constants.MINIO_ENDPOINT_ENV_DEFAULT.value
+    minio_endpoint_schema: Optional[str] = constants.MINIO_ENDPOINT_SCHEMA_ENV_DEFAULT.value
+    minio_endpoint_port: int = constants.MINIO_ENDPOINT_PORT_ENV_DEFAULT.value
+    minio_access_key: Optional[str] = constants.MINIO_ACCESS_KEY_ENV_DEFAULT.value
+    minio_secret_key: Optional[str] = constants.MINIO_SECRET_KEY_ENV_DEFAULT.value
+    minio_bucket: Optional[str] = constants.MINIO_BUCKET_ENV_DEFAULT.value
+    minio_part_size: int = constants.MINIO_PART_SIZE_ENV_DEFAULT.value
+    minio_transfer_concurrency: int = constants.MINIO_TRANSFER_CONCURRENCY_ENV_DEFAULT.value
+    django_settings_mode: Optional[str] = constants.DJANGO_SETTINGS_MODE_ENV_DEFAULT.value
+    scoach_max_inflight_runs: int = constants.SCOACH_MAX_INFLIGHT_RUNS_ENV_DEFAULT.value
+    scoach_result_reporting: Optional[str] = constants.SCOACH_RESULT_REPORTING_ENV_DEFAULT.value
+    scoach_warm_pool: bool = constants.SCOACH_WARM_POOL_ENV_DEFAULT.value
+    scoach_weights_cache_size: int = constants.SCOACH_WEIGHTS_CACHE_SIZE_ENV_DEFAULT.value
+
+    @staticmethod
+    def keys() -> Tuple[str, ...]:
+        """
+        The config file keys (and environment variables) of the settings
+        """
+        return tuple(field.name.upper() for field in fields(Config))
+
+    @classmethod
+    def from_mapping(cls, values: Mapping[str, Any]) -> "Config":
+        """
+        Builds the settings from config file keys or environment
+        variables, casting every value to the type of its field
+        """
+        kwargs = {}
+        for field in fields(cls):
+            value = values.get(field.name.upper())
+            if value is not None:
+                kwargs[field.name] = _cast(value, field.type)
+        return cls(**kwargs)
+
+    def without_database(self) -> "Config":
+        """
+        The same settings without the database connection, for the
+        workers, which never use the database
+        """
+        return replace(
+            self, db_host=None, db_user=None, db_password=None, db_name=None)
+
+
+def _cast(value: Any, to_type: Any) -> Any:
+    """
+    Casts a setting, which may come from an environment variable as a string
+    """
+    if to_type == bool:
+        if isinstance(value, str):
+            return value.lower() in ["true", "yes", "1", "y"]
+        return bool(value)
+    if to_type == int:
+        return int(value)
+    return str(value)
+
+
+_lock = Lock()
+# Keyed by the config file mtime and the environment it was built from
+_cached: Tuple[Tuple, Config, Dict[str, Any]] = None
+_pinned: Config = None
+
+
+def read_config_file() -> Dict[str, Any]:
+    """
+    Reads the config file, parsing it again only if it was modified.
+    A missing file reads as empty.
+    """
+    return _load()[2]
+
+
+def _config_path() -> Path:
+    return constants.SCOACH_DEFAULT_CONFIG_PATH.value
+
+
+def _load() -> Tuple[Tuple, Config, Dict[str, Any]]:
+    global _cached  # pylint: disable=global-statement
+    path = _config_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    environ = tuple(os.environ.get(key) for key in Config.keys())
+    with _lock:
+        if _cached is not None and _cached[0] == (mtime, environ):
+            return _cached
+        file_values = {}
+        if _cached is not None and _cached[0][0] == mtime:
+            file_values = _cached[2]
+        elif mtime is not None:
+            with open(path, "r") as f:  # pylint: disable=unspecified-encoding,invalid-name
+                file_values = yaml.safe_load(f) or {}
+        # The config file takes precedence over the environment
+        config = Config.from_mapping({
+            **{key: value for key, value in zip(Config.keys(), environ)},
+            **file_values,
+        })
+        _cached = ((mtime, environ), config, file_values)
+        return _cached
+
+
+def get_config() -> Config:
+    """
+    Gets the settings of the current process: the ones given to
+    `use_config`, or else the ones from the config file and the environment
+    """
+    if _pinned is not None:
+        return _pinned
+    return _load()[1]
+
+
+def is_config_pinned() -> bool:
+    """
+    Whether the settings of the current process were given to `use_config`
+    """
+    return _pinned is not None
+
+
+def use_config(config: Config):
+    """
+    Makes the current process use the given settings, e.g. on workers
+    that get them from the daemon, without reading the config file.
+    They are exported to the environment for Django and for scripts,
+    and the ones left unset are removed from it (e.g. the database
+    credentials a worker may have inherited).
+    """
+    global _pinned  # pylint: disable=global-statement
+    _pinned = config
+    for field in fields(config):
+        value = getattr(config, field.name)
+        if value is not None:
+            os.environ[field.name.upper()] = str(value)
+        else:
+            os.environ.pop(field.name.upper(), None)
@@ -44,12 +44,19 @@ class constants(Enum):  # pylint: disable=invalid-name
     DB_PASSWORD_ENV_DEFAULT = None
     DB_NAME_ENV = "DB_NAME"
     DB_NAME_ENV_DEFAULT = "scoach"
+    DB_CONN_MAX_AGE_ENV = "DB_CONN_MAX_AGE"
+    DB_CONN_MAX_AGE_ENV_DEFAULT = 0
+    DB_CONN_HEALTH_CHECKS_ENV = "DB_CONN_HEALTH_CHECKS"
+    DB_CONN_HEALTH_CHECKS_ENV_DEFAULT = True
+    DB_POOL_SIZE_ENV = "DB_POOL_SIZE"
+    DB_POOL_SIZE_ENV_DEFAULT = 4
     RUN_STATUS_CREATED = "CREATED"
     RUN_STATUS_QUEUED = "QUEUED"
     RUN_STATUS_RUNNING = "RUNNING"
     RUN_STATUS_COMPLETED = "COMPLETED"
     RUN_STATUS_FAILED = "FAILED"
     RUN_STATUS_CANCELED = "CANCELED"
+    RUN_NOTIFY_CHANNEL = "scoach_runs"
 
     # SLURM
     SLURM_PARTITION_ENV = "SLURM_PARTITION"
@@ -78,8 +85,22 @@ class constants(Enum):  # pylint: disable=invalid-name
     MINIO_SECRET_KEY_ENV_DEFAULT = None
     MINIO_BUCKET_ENV = "MINIO_BUCKET"
     MINIO_BUCKET_ENV_DEFAULT = None
+    MINIO_CONNECT_TIMEOUT = 30
+    MINIO_READ_TIMEOUT = 300
+    MINIO_PART_SIZE_ENV = "MINIO_PART_SIZE"
+    MINIO_PART_SIZE_ENV_DEFAULT = 64 * 1024 * 1024
+    MINIO_TRANSFER_CONCURRENCY_ENV = "MINIO_TRANSFER_CONCURRENCY"
+    MINIO_TRANSFER_CONCURRENCY_ENV_DEFAULT = 4
+    MINIO_STREAM_CHUNK_SIZE = 1024 * 1024
+    LOAD_RUNS_CONCURRENCY = 4
+    WEIGHTS_ZSTD_LEVEL = 3
     WEIGHTS_PATH_PREFIX = "weights/"
     SCRIPTS_PATH_PREFIX = "scripts/"
+    LOGS_PATH_PREFIX = "logs/"
+    CHECKPOINTS_PATH_PREFIX = "checkpoints/"
+    CHECKPOINTS_KEEP = 3
+    RESULTS_PATH_PREFIX = "results/"
+    RUN_LOG_PART_SIZE = 4 * 1024 * 1024
     DATASETS_PATH_PREFIX = "datasets"
 
     # Dask scheduler
@@ -87,7 +108,29 @@ class constants(Enum):  # pylint: disable=invalid-name
 
     # scoach
     SCOACH_DEFAULT_CONFIG_PATH = Path.home() / ".scoach/config.yaml"
-    SCHEDULER_SLEEP_TIME = 30 * SECOND
+    SCOACH_NOTIFY_SOCKET_PATH = Path.home() / ".scoach/scoach.sock"
+    SCOACH_WEIGHTS_CACHE_PATH = Path.home() / ".scoach/cache/weights"
+    SCOACH_WEIGHTS_CACHE_SIZE_ENV = "SCOACH_WEIGHTS_CACHE_SIZE"
+    SCOACH_WEIGHTS_CACHE_SIZE_ENV_DEFAULT = 10 * 1024 * 1024 * 1024
+    SCHEDULER_FALLBACK_POLL_TIME = 5 * MINUTE
+    SCHEDULER_CLAIM_BATCH_SIZE = 100
+    SCHEDULER_QUEUED_LEASE = 10 * MINUTE
+    SCRIPT_CACHE_SIZE = 128
+    SCRIPT_CACHE_REVALIDATE_AFTER = MINUTE
+    SWEEP_LOOKUP_BATCH_SIZE = 500
+    BACKFILL_BATCH_SIZE = 1000
+    LIST_CHUNK_SIZE = 500
+    SCOACH_WARM_POOL_ENV = "SCOACH_WARM_POOL"
+    SCOACH_WARM_POOL_ENV_DEFAULT = True
+    WARM_POOL_PRELOAD_MODULES = ("tensorflow", "scoach.utils")
+    # Set up Django from the config file, so only preloaded when there's one
+    WARM_POOL_CONFIG_MODULES = ("scoach.models",)
+    SCOACH_MAX_INFLIGHT_RUNS_ENV = "SCOACH_MAX_INFLIGHT_RUNS"
+    SCOACH_MAX_INFLIGHT_RUNS_ENV_DEFAULT = 32
+    SCOACH_RESULT_REPORTING_ENV = "SCOACH_RESULT_REPORTING"
+    SCOACH_RESULT_REPORTING_ENV_DEFAULT = "database"
+    RESULT_REPORTING_DATABASE = "database"
+    RESULT_REPORTING_MANIFEST = "manifest"
 
     # Django
     DJANGO_SETTINGS_MODE_ENV = "DJANGO_SETTINGS_MODE"
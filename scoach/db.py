@@ -0,0 +1,47 @@
+"""
+Provides db_session, which scopes the use of database connections by
+the daemon threads, the tasks and the training scripts, like Django
+does for requests.
+"""
+
+from functools import wraps
+
+from scoach.config import get_config
+
+
+def check_connections():
+    """
+    Closes the connections of the current thread that can't be reused:
+    the ones past `DB_CONN_MAX_AGE`, broken by an error, or, with
+    `DB_CONN_HEALTH_CHECKS`, not answering anymore
+    """
+    from django.db import connections
+    health_checks = get_config().db_conn_health_checks
+    for connection in connections.all():
+        connection.close_if_unusable_or_obsolete()
+        if health_checks and connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def release_connections():
+    """
+    Closes the connections of the current thread, unless they are
+    persistent and still usable
+    """
+    from django.db import close_old_connections
+    close_old_connections()
+
+
+def db_session(func):
+    """
+    Decorator for units of work using the database. Persistent
+    connections are checked before and kept after, others are closed.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        check_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            release_connections()
+    return wrapper
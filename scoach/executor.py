@@ -5,68 +5,122 @@ Provides Executor, a wrapper for a Prefect Flow
 import os
 import sys
 import json
+import asyncio
 import tempfile
 import subprocess
-from time import sleep
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 from threading import Thread
-from functools import partial
+from functools import lru_cache
+from os.path import join
 
-import jinja2
 import prefect
-from prefect import task, Flow
+from prefect import task, Flow, Parameter
+from prefect.engine import signals
 from prefect.engine.state import State
-from prefect.executors import DaskExecutor
+from distributed import Client
 
+from scoach.checkpoints import latest_checkpoint
+from scoach.config import Config, get_config, use_config
 from scoach.constants import constants
+from scoach.db import db_session
 from scoach.logging import logger
+from scoach.runs import RunClaimLost, transition_run
 from scoach.scheduler import Scheduler
+from scoach.scripts import compile_template, script_cache
 from scoach.utils import (
     get_minio_client,
-    load_config_file_to_envs,
-    load_env_as_type,
-    safe_object_get,
-    parse_parameters
+    parse_parameters,
+    RunLogWriter,
 )
+from scoach.warm_pool import WarmPoolUnavailable, warm_pool
 
 
-@task
-def setup():
-    load_config_file_to_envs()
+def forward_output(pipe, stream: str, log_writer: RunLogWriter, log: Callable):
+    """
+    Forwards the output of a process line by line, as it arrives,
+    to a logger and to the run log
+    """
+    for line in iter(pipe.readline, ""):
+        log(f"[{stream}] {line.rstrip()}")
+        log_writer.write(line)
+    pipe.close()
+    log_writer.flush()
 
 
 @task
-def update_run_status(run_id: str):
+def setup(config: Config = None):
+    """
+    Task to apply the settings sent by the daemon, so workers
+    never read the config file
+
+    Args:
+        - config (Config): the settings of the daemon, or None to
+            keep the ones of the current process
     """
-    Task to update the status of a run
+    if config is not None:
+        use_config(config)
+
+
+@db_session
+def prepare_run(run_id: str):
+    """
+    Marks a queued run as running and fetches its script and the
+    variables to render it with. Runs on the daemon, so workers never
+    query the database.
 
     Args:
-        - run (Run): the run to update
+        - run_id (str): the id of the run
+
+    Returns:
+        - str: the text of the script template
+        - dict: the variables to render the template with
+
+    Raises:
+        - RunClaimLost: if the run is no longer queued
     """
-    from scoach.models import Status, Run
-    status = safe_object_get(
-        Status, status=constants.RUN_STATUS_RUNNING.value)
-    if status is None:
-        status = Status(status=constants.RUN_STATUS_RUNNING.value)
-        status.save()
-    run: Run = safe_object_get(Run, id=run_id)
-    run.status = status
-    run.save()
+    from scoach.models import Run
+    if not transition_run(
+        run_id,
+        constants.RUN_STATUS_RUNNING.value,
+        from_statuses=[constants.RUN_STATUS_QUEUED.value],
+    ):
+        raise RunClaimLost(f"Run #{run_id} is no longer queued")
+    run: Run = Run.objects.select_related(
+        "script", "model", "parameters").get(id=run_id)
+    # Content-addressed scripts never change, legacy ones
+    # are checked against their ETag
+    template_text = script_cache.get(
+        get_minio_client(),
+        get_config().minio_bucket,
+        run.script.path,
+        revalidate=run.script.digest is None,
+    )
+    # Retried runs resume from their latest checkpoint, fresh
+    # ones have none to look up
+    checkpoint = latest_checkpoint(run_id) if run.retries else None
+    variables = {
+        "run_id": run_id,
+        "model_config": f"\"\"\"{run.model.config}\"\"\"",
+        "checkpoint_step": checkpoint[0] if checkpoint else None,
+        **parse_parameters(json.loads(run.parameters.config)),
+    }
+    return template_text, variables
 
 
 @task
-def render_template(template_text: str, **kwargs):
+def render_template(template_text: str, variables: dict):
     """
     Task to render a jinja2 template
 
     Args:
         - template_text (str): the text of the template to render
-        - **kwargs (dict): the keyword arguments to pass to the template
+        - variables (dict): the variables to pass to the template
 
     Returns:
         - str: the rendered template
     """
-    return jinja2.Template(template_text).render(**kwargs)
+    return compile_template(template_text).render(**variables)
 
 
 @task
@@ -77,6 +131,10 @@ def execute_template(rendered_template: str, run_id: Any):
 
     Args:
         - rendered_template (str): the rendered template to execute
+        - run_id: the id of the run
+
+    Raises:
+        - FAIL: if the script exits with a non-zero code
     """
     logger = prefect.context.get("logger")
     logger.info(f"Executing template:\n{rendered_template}")
@@ -88,114 +146,181 @@ def execute_template(rendered_template: str, run_id: Any):
         f.flush()
         os.fsync(f.fileno())
 
-        # Execute the script
-        process = subprocess.Popen(
-            [sys.executable, f.name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
+        # Output is streamed to MinIO as it arrives
+        minio_client = get_minio_client()
+        bucket = get_config().minio_bucket
+        log_writers = {
+            stream: RunLogWriter(minio_client, bucket, run_id, stream)
+            for stream in ("stdout", "stderr")
+        }
+
+        # The script writes to pipes that are forwarded while it runs
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        readers = [
+            Thread(
+                target=forward_output,
+                args=(open(fd, "r", buffering=1), stream, log_writers[stream], logger.info),
+                daemon=True,
+            )
+            for fd, stream in ((stdout_read, "stdout"), (stderr_read, "stderr"))
+        ]
+        for reader in readers:
+            reader.start()
+        logger.info(
+            f"Output of run #{run_id} is stored at "
+            f"{join(constants.LOGS_PATH_PREFIX.value, str(run_id))}")
+
+        try:
+            return_code = None
+            if get_config().scoach_warm_pool:
+                try:
+                    # Fork from the warm interpreter, imports are already done
+                    return_code = warm_pool.run(f.name, stdout_write, stderr_write)
+                except WarmPoolUnavailable as e:
+                    logger.warning(
+                        f"Warm interpreter unavailable, starting a new one: {e}")
+            if return_code is None:
+                # Execute the script, unbuffered so its output can be streamed
+                process = subprocess.Popen(
+                    [sys.executable, f.name],
+                    stdout=stdout_write,
+                    stderr=stderr_write,
+                    env={**os.environ, "PYTHONUNBUFFERED": "1"},
+                )
+                os.close(stdout_write)
+                os.close(stderr_write)
+                stdout_write = stderr_write = None
+                return_code = process.wait()
+        finally:
+            # Only the script keeps the pipes open, so readers see EOF when it exits
+            for fd in (stdout_write, stderr_write):
+                if fd is not None:
+                    os.close(fd)
+
+        # Block until all output is forwarded
+        for reader in readers:
+            reader.join()
+        logger.info(f"Run #{run_id} exited with code {return_code}")
+        # Fails the flow, so the run is stored as failed and can be retried
+        if return_code != 0:
+            raise signals.FAIL(f"Run #{run_id} exited with code {return_code}")
+
 
-        # Wait for the process to finish
-        while process.poll() is None:
-            # Sleep for a while
-            logger.debug(f"Run #{run_id} still running")
-            sleep(10)
+@lru_cache(maxsize=None)
+def training_flow() -> Flow:
+    """
+    Builds the training flow, once per process. The run to train is
+    given by the `run_id` parameter, its script and variables by the
+    `template_text` and `variables` parameters, and the settings to use
+    by the `config` parameter.
+    """
+    with Flow("Training Flow") as flow:
+        run_id = Parameter("run_id")
+        template_text = Parameter("template_text")
+        variables = Parameter("variables")
+        config = Parameter("config", default=None)
+        ready = setup(config)
+        rendered_template = render_template(template_text, variables)
+        execute_template(rendered_template, run_id, upstream_tasks=[ready])
+    return flow
 
-        # Get the output
-        stdout, stderr = process.communicate()
 
-        # Log the output
-        logger.info(f"stdout:\n{stdout}")
-        logger.info(f"stderr:\n{stderr}")
+def run_training_flow(run_id: str, template_text: str, variables: dict, config: Config = None) -> State:
+    """
+    Runs the training flow for a run, blocking until it's finished
+    """
+    return training_flow().run(parameters={
+        "run_id": run_id,
+        "template_text": template_text,
+        "variables": variables,
+        "config": config,
+    })
 
 
 class Executor:  # pylint: disable=too-few-public-methods
     """
     A wrapper for a Prefect Flow
+
+    Flows are submitted as a whole to the Dask cluster (or to a local
+    thread pool when running locally) and awaited on the daemon's event
+    loop, so supervising a run doesn't hold a thread on the login node.
+    The flow is built once per process, so dispatching a run only
+    serializes its id, its script and its variables. The daemon moves
+    the run to running and reads its script before dispatching it, so
+    workers never use the database.
     """
 
-    def __init__(self, scheduler: Scheduler, local: bool = False):
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        local: bool = False,
+        pool: ThreadPoolExecutor = None,
+        max_inflight: int = constants.SCOACH_MAX_INFLIGHT_RUNS_ENV_DEFAULT.value,
+    ):
         self._scheduler = scheduler
-        self._executor = DaskExecutor(scheduler.address)
         self._local = local
+        self._pool = pool or ThreadPoolExecutor(get_config().db_pool_size)
+        # Local flows block a thread for as long as the run lasts
+        self._local_pool = ThreadPoolExecutor(
+            max_inflight, thread_name_prefix="scoach-local") if local else None
+        self._client: Client = None
 
-    def _threaded_execution_handler(self, flow: Flow, run_id: str):
+    async def start(self):
         """
-        Threaded handler for the flow execution
+        Connects to the Dask cluster from the running event loop
+        """
+        if not self._local and self._client is None:
+            self._client = await Client(self._scheduler.address, asynchronous=True)
+
+    @staticmethod
+    @db_session
+    def _store_final_status(run_id: str, state: State):
+        """
+        Stores the final status of the run once its flow is finished
         """
-        from scoach.models import Status, Run
-        status = safe_object_get(
-            Status, status=constants.RUN_STATUS_QUEUED.value)
-        if status is None:
-            status = Status(status=constants.RUN_STATUS_QUEUED.value)
-            status.save()
-        run: Run = safe_object_get(Run, id=run_id)
-        run.status = status
-        run.save()
-        if self._local:
-            logger.info("Running locally")
-            state: State = flow.run()
-        else:
-            logger.info("Running on scheduler")
-            state: State = flow.run(executor=self._executor)
-        while not state.is_finished():
-            sleep(0.25)
         if state.is_failed():
-            status = safe_object_get(
-                Status, status=constants.RUN_STATUS_FAILED.value)
-            if status is None:
-                status = Status(
-                    status=constants.RUN_STATUS_FAILED.value)
-                status.save()
-            run: Run = safe_object_get(Run, id=run_id)
-            run.status = status
-            run.save()
+            transition_run(
+                run_id,
+                constants.RUN_STATUS_FAILED.value,
+                from_statuses=[constants.RUN_STATUS_RUNNING.value],
+            )
             logger.error(
                 f"Job {run_id} failed with error: {state.result}")
         elif state.is_successful():
-            status = safe_object_get(
-                Status, status=constants.RUN_STATUS_COMPLETED.value)
-            if status is None:
-                status = Status(
-                    status=constants.RUN_STATUS_COMPLETED.value)
-                status.save()
-            run: Run = safe_object_get(Run, id=run_id)
-            run.status = status
-            run.save()
+            transition_run(
+                run_id,
+                constants.RUN_STATUS_COMPLETED.value,
+                from_statuses=[constants.RUN_STATUS_RUNNING.value],
+            )
             logger.info(f"Job {run_id} completed successfully")
 
-    def execute(self, run_id: str):
+    async def execute(self, run_id: str):
         """
-        Execute the training job
+        Execute the training job, returning once its flow is finished
+
+        Args:
+            - run_id (str): the id of the run to execute
         """
-        from scoach.models import Model, Run
-        with Flow("Training Flow") as flow:
-            setup()
-            update_run_status(run_id=run_id)
-            minio_client = get_minio_client()
-            bucket = load_env_as_type(
-                constants.MINIO_BUCKET_ENV.value,
-                default=constants.MINIO_BUCKET_ENV_DEFAULT.value,
-            )
-            run: Run = safe_object_get(Run, id=run_id)
-            script_path = run.script.path
-            template_text = (
-                minio_client.get_object(
-                    bucket, script_path).read().decode("utf-8")
-            )
-            model: Model = run.model
-            logger.info(model.config)
-            rendered_template = render_template(
+        loop = asyncio.get_running_loop()
+        template_text, variables = await loop.run_in_executor(
+            self._pool, prepare_run, run_id)
+        if self._local:
+            logger.info("Running locally")
+            state: State = await loop.run_in_executor(
+                self._local_pool, run_training_flow, run_id, template_text, variables)
+        else:
+            logger.info("Running on scheduler")
+            await self.start()
+            # Workers get the settings along with the run, but never
+            # the database credentials
+            state: State = await self._client.submit(
+                run_training_flow,
+                run_id,
                 template_text,
-                run_id=run_id,
-                model_config=f"\"\"\"{model.config}\"\"\"",
-                **parse_parameters(json.loads(run.parameters.config)),
+                variables,
+                get_config().without_database(),
+                pure=False,
             )
-            execute_template(rendered_template, run_id)
-
-        thread = Thread(
-            target=partial(self._threaded_execution_handler, flow, run_id),
-            daemon=True,
-        )
-        thread.start()
+        await loop.run_in_executor(
+            self._pool, self._store_final_status, run_id, state)
@@ -17,6 +17,7 @@ class Model(models.Model):
     date_modified = models.DateTimeField(auto_now=True)
     description = models.TextField(blank=True, null=True)
     config = models.TextField(blank=True, null=True)
+    digest = models.CharField(max_length=64, unique=True, null=True)
 
     def __str__(self):
         return f"Model #{self.id} (desc={self.description},created={self.date_created})"
@@ -28,6 +29,7 @@ class Script(models.Model):
     date_modified = models.DateTimeField(auto_now=True)
     description = models.TextField(blank=True, null=True)
     path = models.TextField()
+    digest = models.CharField(max_length=64, unique=True, null=True)
 
     def __str__(self):
         return f"Script #{self.id} (desc={self.description},created={self.date_created})"
@@ -39,6 +41,7 @@ class Parameters(models.Model):
     date_modified = models.DateTimeField(auto_now=True)
     description = models.TextField(blank=True, null=True)
     config = models.TextField(blank=True, null=True)
+    digest = models.CharField(max_length=64, unique=True, null=True)
 
     def __str__(self):
         return f"Parameters #{self.id} (desc={self.description},created={self.date_created})"
@@ -50,6 +53,7 @@ class Weights(models.Model):
     date_modified = models.DateTimeField(auto_now=True)
     description = models.TextField(blank=True, null=True)
     path = models.TextField()
+    codec = models.CharField(max_length=16, default="h5")
 
     def __str__(self):
         return f"Weights #{self.id} (desc={self.description},created={self.date_created})"
@@ -57,7 +61,7 @@ class Weights(models.Model):
 
 class Status(models.Model):
     id = models.AutoField(primary_key=True)
-    status = models.TextField()
+    status = models.TextField(unique=True)
     description = models.TextField(blank=True, null=True)
 
     def __str__(self):
@@ -66,7 +70,7 @@ class Status(models.Model):
 
 class Tag(models.Model):
     id = models.AutoField(primary_key=True)
-    name = models.TextField()
+    name = models.TextField(unique=True)
     description = models.TextField(blank=True, null=True)
 
     def __str__(self):
@@ -86,6 +90,19 @@ class Run(models.Model):
     tags = models.ManyToManyField(Tag)
     train_score = models.FloatField(blank=True, null=True)
     validation_score = models.FloatField(blank=True, null=True)
+    priority = models.IntegerField(default=0)
+    # Times the run was retried after failing
+    retries = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Claiming runs, in dispatch order
+            models.Index(fields=["status", "-priority", "date_created"], name="run_claim_idx"),
+            # Listing runs by status and date
+            models.Index(fields=["status", "date_created"], name="run_status_created_idx"),
+            # Leaderboards and score filters
+            models.Index(fields=["validation_score"], name="run_validation_score_idx"),
+        ]
 
     def __str__(self):
         return f"Run #{self.id} (status={self.status},tags={[t.name for t in self.tags.all()]},created={self.date_created})"
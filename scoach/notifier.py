@@ -0,0 +1,138 @@
+"""
+Provides RunListener and notify_new_runs, used to wake up the scoach
+daemon as soon as new runs are submitted.
+"""
+
+import os
+import select
+import socket
+from pathlib import Path
+
+from scoach.constants import constants
+from scoach.logging import logger
+
+
+def _socket_path() -> Path:
+    return constants.SCOACH_NOTIFY_SOCKET_PATH.value
+
+
+def notify_new_runs():
+    """
+    Notifies listening daemons that new runs are available.
+
+    On PostgreSQL this sends a NOTIFY on the runs channel. Other backends
+    (e.g. SQLite) are local only, so a datagram is sent to the daemon socket.
+    """
+    from django.db import connection
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {constants.RUN_NOTIFY_CHANNEL.value}")
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.sendto(b"\0", str(_socket_path()))
+        except OSError:
+            # No daemon is listening, it will pick the runs up on start
+            pass
+
+
+class RunListener:
+    """
+    Blocks the daemon until new runs are announced or a timeout expires
+    """
+
+    def __init__(self):
+        self._pg_connection = None
+        self._socket: socket.socket = None
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+
+    def _connect(self):
+        """
+        Starts listening on the channel that matches the database backend
+        """
+        from django.db import connection
+        if connection.vendor == "postgresql":
+            if self._pg_connection is None or self._pg_connection.closed:
+                pg_connection = connection.get_new_connection(
+                    connection.get_connection_params())
+                pg_connection.autocommit = True
+                with pg_connection.cursor() as cursor:
+                    cursor.execute(
+                        f"LISTEN {constants.RUN_NOTIFY_CHANNEL.value}")
+                self._pg_connection = pg_connection
+        elif self._socket is None:
+            path = _socket_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                path.unlink()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(str(path))
+            sock.setblocking(False)
+            self._socket = sock
+
+    def _drain(self, readable: list):
+        """
+        Consumes every pending notification so they are coalesced
+        into a single wake up
+        """
+        if self._wakeup_read in readable:
+            try:
+                while os.read(self._wakeup_read, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+        if self._socket is not None and self._socket in readable:
+            try:
+                while True:
+                    self._socket.recv(4096)
+            except BlockingIOError:
+                pass
+        if self._pg_connection is not None and self._pg_connection in readable:
+            try:
+                self._pg_connection.poll()
+                del self._pg_connection.notifies[:]
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Lost connection to run notifications: {e}")
+                self._pg_connection.close()
+                self._pg_connection = None
+
+    def wakeup(self):
+        """
+        Wakes up a pending (or the next) call to `wait`
+        """
+        os.write(self._wakeup_write, b"\0")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits for a notification for at most `timeout` seconds.
+
+        Returns:
+            - bool: True if woken up by a notification, False on timeout
+        """
+        try:
+            self._connect()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error(
+                f"Could not listen for run notifications, polling instead: {e}")
+        waitables = [self._wakeup_read] + [
+            waitable for waitable in (self._pg_connection, self._socket)
+            if waitable is not None
+        ]
+        readable, _, _ = select.select(waitables, [], [], timeout)
+        self._drain(readable)
+        return len(readable) > 0
+
+    def close(self):
+        """
+        Stops listening and releases all resources
+        """
+        if self._pg_connection is not None:
+            self._pg_connection.close()
+            self._pg_connection = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            _socket_path().unlink(missing_ok=True)
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
@@ -0,0 +1,160 @@
+"""
+Provides result manifests, which let training scripts report their
+results through MinIO instead of writing to the database from every
+compute node. The daemon applies them to the database in batches.
+"""
+
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from os.path import basename, join
+from typing import Any, Dict, Iterable, List, Optional
+
+from scoach.config import get_config
+from scoach.constants import constants
+from scoach.logging import logger
+from scoach.utils import bulk_create_with_ids, get_minio_client
+
+
+def is_manifest_reporting() -> bool:
+    """
+    Whether training scripts report their results with manifests
+    """
+    reporting = get_config().scoach_result_reporting
+    if reporting not in (
+        constants.RESULT_REPORTING_DATABASE.value,
+        constants.RESULT_REPORTING_MANIFEST.value,
+    ):
+        raise ValueError(f"Unknown result reporting: {reporting}")
+    return reporting == constants.RESULT_REPORTING_MANIFEST.value
+
+
+def result_manifest_path(run_id: Any) -> str:
+    return join(constants.RESULTS_PATH_PREFIX.value, f"{run_id}.json")
+
+
+def write_result_manifest(
+    minio_client,
+    run_id: Any,
+    train_score: float,
+    validation_score: float,
+    weights_path: str,
+    codec: str,
+):
+    """
+    Writes the results of a run to MinIO, for the daemon to apply
+
+    Args:
+        - minio_client (Minio): the client to write the manifest with
+        - run_id: the id of the run
+        - train_score (float): the train score of the run
+        - validation_score (float): the validation score of the run
+        - weights_path (str): where the weights of the run were uploaded
+        - codec (str): the codec the weights were saved with
+    """
+    data = json.dumps({
+        "run_id": int(run_id),
+        "train_score": train_score,
+        "validation_score": validation_score,
+        "weights_path": weights_path,
+        "codec": codec,
+    }).encode("utf-8")
+    minio_client.put_object(
+        get_config().minio_bucket,
+        result_manifest_path(run_id),
+        io.BytesIO(data),
+        len(data),
+        content_type="application/json",
+    )
+
+
+def _read_manifest(minio_client, bucket: str, object_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Reads a manifest, or returns None if it doesn't exist (e.g. it was
+    already applied) or can't be parsed
+    """
+    from minio.error import S3Error  # pylint: disable=import-outside-toplevel
+    try:
+        response = minio_client.get_object(bucket, object_name)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return None
+        raise
+    try:
+        return json.loads(response.read())
+    except ValueError as e:
+        logger.error(f"Invalid result manifest {object_name}: {e}")
+        return None
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def apply_result_manifests(run_ids: Iterable[Any] = None) -> List[int]:
+    """
+    Applies result manifests to the database in a single transaction,
+    then removes them
+
+    Args:
+        - run_ids: the runs whose manifests to apply, or None for
+            every manifest in MinIO (e.g. left over from a restart)
+
+    Returns:
+        - list: the ids of the runs whose results were applied
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.db import transaction
+    from django.utils import timezone
+    from scoach.models import Run, Weights
+    minio_client = get_minio_client()
+    bucket = get_config().minio_bucket
+    if run_ids is None:
+        object_names = [
+            obj.object_name
+            for obj in minio_client.list_objects(
+                bucket, prefix=constants.RESULTS_PATH_PREFIX.value)
+        ]
+    else:
+        object_names = [result_manifest_path(run_id) for run_id in run_ids]
+    if not object_names:
+        return []
+    with ThreadPoolExecutor(get_config().minio_transfer_concurrency) as pool:
+        manifests = {
+            object_name: manifest
+            for object_name, manifest in zip(object_names, pool.map(
+                lambda object_name: _read_manifest(minio_client, bucket, object_name),
+                object_names,
+            ))
+            if manifest is not None
+        }
+    runs = Run.objects.in_bulk([manifest["run_id"] for manifest in manifests.values()])
+    for object_name, manifest in manifests.items():
+        if manifest["run_id"] not in runs:
+            logger.warning(f"Result manifest {basename(object_name)} of a missing run")
+    applied = {
+        object_name: manifest for object_name, manifest in manifests.items()
+        if manifest["run_id"] in runs
+    }
+    if applied:
+        now = timezone.now()
+        with transaction.atomic():
+            weights = bulk_create_with_ids(Weights, [
+                Weights(path=manifest["weights_path"], codec=manifest["codec"])
+                for manifest in applied.values()
+            ])
+            for manifest, run_weights in zip(applied.values(), weights):
+                run = runs[manifest["run_id"]]
+                run.train_score = manifest["train_score"]
+                run.validation_score = manifest["validation_score"]
+                run.weights = run_weights
+                # bulk_update skips auto_now
+                run.date_modified = now
+            Run.objects.bulk_update(
+                [runs[manifest["run_id"]] for manifest in applied.values()],
+                ["train_score", "validation_score", "weights", "date_modified"],
+            )
+    # Manifests of missing runs can never be applied either
+    for object_name in manifests:
+        minio_client.remove_object(bucket, object_name)
+    logger.info(f"Applied the results of {len(applied)} runs")
+    return [manifest["run_id"] for manifest in applied.values()]
@@ -0,0 +1,214 @@
+"""
+Provides helpers for moving runs through their lifecycle
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from itertools import count
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from scoach.constants import constants
+
+
+_status_ids: Dict[str, int] = {}
+
+
+class RunClaimLost(RuntimeError):
+    """
+    Raised when a claimed run is no longer queued when it's started, e.g.
+    it was requeued after its lease expired and claimed by another daemon
+    """
+
+
+def get_status_id(status: str) -> int:
+    """
+    Gets the id of a Status by its name, creating it if needed. Ids are
+    cached for the whole process, as statuses are never modified.
+    """
+    from scoach.models import Status
+    status_id = _status_ids.get(status)
+    if status_id is None:
+        status_id = Status.objects.get_or_create(status=status)[0].id
+        _status_ids[status] = status_id
+    return status_id
+
+
+def transition_run(run_id: int, status: str, from_statuses: Iterable[str] = None, **values) -> bool:
+    """
+    Moves a run to a new status with a single UPDATE statement.
+
+    Args:
+        - run_id (int): the id of the run
+        - status (str): the new status
+        - from_statuses (list): if given, the run is only updated while
+            still in one of these statuses, so concurrent transitions
+            never overwrite each other
+        - values: other fields to update along with the status
+
+    Returns:
+        - bool: whether the run was updated
+    """
+    from scoach.models import Run
+    runs = Run.objects.filter(id=run_id)
+    if from_statuses is not None:
+        runs = runs.filter(
+            status_id__in=[get_status_id(name) for name in from_statuses])
+    return runs.update(
+        status_id=get_status_id(status), date_modified=timezone.now(), **values) == 1
+
+
+def filter_runs(
+    status: str = None,
+    tags: List[str] = None,
+    since: datetime = None,
+    until: datetime = None,
+    min_score: float = None,
+    max_score: float = None,
+):
+    """
+    Builds a query for the runs matching every given filter, ready to be
+    listed without a query per run.
+
+    Args:
+        - status (str): the status of the runs
+        - tags (list): tags the runs must all have
+        - since (datetime): only runs created at or after this date
+        - until (datetime): only runs created before this date
+        - min_score (float): minimum validation score
+        - max_score (float): maximum validation score
+
+    Returns:
+        - QuerySet: the matching runs
+    """
+    from scoach.models import Run
+    runs = Run.objects.select_related("status").prefetch_related("tags")
+    if status is not None:
+        runs = runs.filter(status__status=status)
+    for tag in tags or []:
+        runs = runs.filter(tags__name=tag)
+    if since is not None:
+        runs = runs.filter(date_created__gte=since)
+    if until is not None:
+        runs = runs.filter(date_created__lt=until)
+    if min_score is not None:
+        runs = runs.filter(validation_score__gte=min_score)
+    if max_score is not None:
+        runs = runs.filter(validation_score__lte=max_score)
+    # Tag names are unique, so each tag matches a run at most once and
+    # no DISTINCT is needed
+    return runs
+
+
+def claim_runs(limit: int) -> List[Tuple[int, int]]:
+    """
+    Atomically claims up to `limit` created runs, moving them to the
+    queued status. Runs claimed concurrently by another daemon are skipped,
+    so no run is ever dispatched twice.
+
+    Args:
+        - limit (int): the maximum number of runs to claim
+
+    Returns:
+        - list: (id, priority) of the claimed runs, most urgent first
+    """
+    from scoach.models import Run
+    created = get_status_id(constants.RUN_STATUS_CREATED.value)
+    queued = get_status_id(constants.RUN_STATUS_QUEUED.value)
+    pending = Run.objects.filter(status_id=created).order_by(
+        "-priority", "date_created", "id")
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            runs = [*pending.select_for_update(skip_locked=True)
+                    .values_list("id", "priority")[:limit]]
+            Run.objects.filter(id__in=[run_id for run_id, _ in runs]).update(
+                status_id=queued, date_modified=timezone.now())
+        return runs
+    # Without row locks, only keep the runs whose status we actually changed
+    return [
+        (run_id, priority)
+        for run_id, priority in pending.values_list("id", "priority")[:limit]
+        if Run.objects.filter(id=run_id, status_id=created).update(
+            status_id=queued, date_modified=timezone.now())
+    ]
+
+
+def requeue_stale_runs(lease: int = constants.SCHEDULER_QUEUED_LEASE.value) -> int:
+    """
+    Moves the runs queued for longer than a lease back to created, so they
+    are claimed again. Claimed runs are dispatched right away, so these were
+    left behind by a daemon that stopped before dispatching them.
+
+    Args:
+        - lease (int): seconds a run may stay queued
+
+    Returns:
+        - int: how many runs were requeued
+    """
+    from scoach.models import Run
+    now = timezone.now()
+    return Run.objects.filter(
+        status_id=get_status_id(constants.RUN_STATUS_QUEUED.value),
+        date_modified__lt=now - timedelta(seconds=lease),
+    ).update(
+        status_id=get_status_id(constants.RUN_STATUS_CREATED.value),
+        date_modified=now,
+    )
+
+
+class DispatchQueue:
+    """
+    Bounded priority queue for the runs claimed by the daemon.
+
+    At most `max_inflight` runs are executing at once, and runs are only
+    claimed for free slots, so the daemon footprint doesn't depend on how
+    many runs are pending in the database, and claimed runs never sit
+    queued in memory for long. Higher priorities are dispatched first,
+    ties in claiming order.
+    """
+
+    def __init__(self, max_inflight: int):
+        self._max_inflight = max_inflight
+        self._heap: List[Tuple[int, int, int]] = []
+        self._counter = count()
+        self._inflight = set()
+        self._lock = Lock()
+
+    @property
+    def claimable(self) -> int:
+        """
+        How many more runs may be claimed without exceeding the bounds
+        """
+        with self._lock:
+            return self._max_inflight - len(self._heap) - len(self._inflight)
+
+    def push(self, run_id: int, priority: int = 0):
+        """
+        Adds a claimed run to the queue
+        """
+        with self._lock:
+            heapq.heappush(
+                self._heap, (-priority, next(self._counter), run_id))
+
+    def pop_ready(self) -> List[int]:
+        """
+        Pops the most urgent runs while there are free slots, marking
+        them as in flight
+        """
+        ready = []
+        with self._lock:
+            while self._heap and len(self._inflight) < self._max_inflight:
+                _, _, run_id = heapq.heappop(self._heap)
+                self._inflight.add(run_id)
+                ready.append(run_id)
+        return ready
+
+    def done(self, run_id: int):
+        """
+        Releases the slot held by a run
+        """
+        with self._lock:
+            self._inflight.discard(run_id)
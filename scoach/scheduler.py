@@ -4,8 +4,8 @@ Provides the Scheduler class
 
 from dask_jobqueue import SLURMCluster
 
+from scoach.config import get_config
 from scoach.constants import constants
-from scoach.utils import load_env_as_type
 
 
 class Scheduler:  # pylint: disable=too-few-public-methods
@@ -26,33 +26,13 @@ class Scheduler:  # pylint: disable=too-few-public-methods
         exclusive=None,
         max_workers=None,
     ):
-        partition = partition or load_env_as_type(
-            constants.SLURM_PARTITION_ENV.value,
-            default=constants.SLURM_PARTITION_ENV_DEFAULT.value,
-        )
-        cores = cores or load_env_as_type(
-            constants.SLURM_CORES_PER_JOB_ENV.value,
-            int,
-            default=constants.SLURM_CORES_PER_JOB_ENV_DEFAULT.value,
-        )
-        memory = memory or load_env_as_type(
-            constants.SLURM_MEMORY_PER_JOB_ENV.value,
-            default=constants.SLURM_MEMORY_PER_JOB_ENV_DEFAULT.value,
-        )
-        name = name or load_env_as_type(
-            constants.SLURM_WORKER_NAME_ENV.value,
-            default=constants.SLURM_WORKER_NAME_ENV_DEFAULT.value,
-        )
-        exclusive = exclusive or load_env_as_type(
-            constants.SLURM_JOB_EXCLUSIVE_ENV.value,
-            bool,
-            default=constants.SLURM_JOB_EXCLUSIVE_ENV_DEFAULT.value,
-        )
-        max_workers = max_workers or load_env_as_type(
-            constants.SLURM_MAX_WORKERS_ENV.value,
-            int,
-            default=constants.SLURM_MAX_WORKERS_ENV_DEFAULT.value,
-        )
+        config = get_config()
+        partition = partition or config.slurm_partition
+        cores = cores or config.slurm_cores_per_job
+        memory = memory or config.slurm_memory_per_job
+        name = name or config.slurm_worker_name
+        exclusive = exclusive or config.slurm_job_exclusive
+        max_workers = max_workers or config.slurm_max_workers
         job_extra = ["--exclusive"] if exclusive else []
         self._cluster = SLURMCluster(
             queue=partition, cores=cores, memory=memory, name=name, job_extra=job_extra,
@@ -2,41 +2,77 @@
 Provides scoach, the main class for the application.
 """
 
-import json
-import uuid
-import time
-from os.path import join
+import asyncio
+from functools import partial
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
+from scoach.config import get_config
 from scoach.constants import constants
-from scoach.executor import Executor
+from scoach.db import db_session
 from scoach.logging import logger
-from scoach.scheduler import Scheduler
-from scoach.utils import get_minio_client, load_env_as_type, save_to_minio
+from scoach.notifier import RunListener
+from scoach.results import apply_result_manifests, is_manifest_reporting
+from scoach.runs import (
+    DispatchQueue,
+    RunClaimLost,
+    claim_runs,
+    requeue_stale_runs,
+    transition_run,
+)
+
+if TYPE_CHECKING:
+    from scoach.executor import Executor
+    from scoach.scheduler import Scheduler
 
 
 class Scoach:
     """
     Main class for scoach
+
+    Runs are supervised on a single asyncio event loop. Blocking database
+    and MinIO calls go through a small bounded thread pool, so the daemon
+    footprint grows with the active work and not with a thread per run.
     """
 
     def __init__(self, local: bool = False):
         logger.info("scoach instance initializing...")
-        self._scheduler: Scheduler = None
-        self._executor: Executor = None
+        self._scheduler: "Scheduler" = None
+        self._executor: "Executor" = None
         self._scheduler_thread: Thread = None
+        self._listener: RunListener = None
+        config = get_config()
+        self._max_inflight: int = config.scoach_max_inflight_runs
+        self._queue = DispatchQueue(self._max_inflight)
+        # Each thread holds at most one database connection
+        self._pool = ThreadPoolExecutor(
+            config.db_pool_size, thread_name_prefix="scoach")
+        self._wakeup: asyncio.Event = None
+        self._tasks = set()
+        # Runs whose result manifests are waiting to be applied
+        self._finished: set = set()
+        self._manifest_reporting: bool = is_manifest_reporting()
         self._local: bool = local
 
     def _initialize_scheduler(self):
         logger.info("Starting Scheduler instance...")
-        self._scheduler: Scheduler = Scheduler()
+        # Dask is only needed once the daemon starts
+        from scoach.scheduler import Scheduler  # pylint: disable=import-outside-toplevel
+        self._scheduler: "Scheduler" = Scheduler()
         logger.info("Scheduler instance started successfully!")
 
     def _initialize_executor(self):
         logger.info("Starting Executor instance...")
         if not self._scheduler:
             self._initialize_scheduler()
-        self._executor: Executor = Executor(self._scheduler, local=self._local)
+        from scoach.executor import Executor  # pylint: disable=import-outside-toplevel
+        self._executor: "Executor" = Executor(
+            self._scheduler,
+            local=self._local,
+            pool=self._pool,
+            max_inflight=self._max_inflight,
+        )
         logger.info("Executor instance started successfully!")
 
     def _initialize_scheduler_thread(self):
@@ -45,34 +81,127 @@ class Scoach:
         self._scheduler_thread.start()
         logger.info("Scheduler thread started successfully!")
 
-    @logger.catch
-    def _threaded_scheduler(self):
+    async def _blocking(self, func, *args, **kwargs):
         """
-        Constantly checks for new runs
-        and launches them
-        :return:
+        Runs a blocking call on the thread pool
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, partial(db_session(func), *args, **kwargs))
+
+    def _claim(self):
+        """
+        Claims as many runs as there are free slots, after requeuing the
+        runs left queued by a stopped daemon
         """
-        from scoach.models import Run
+        requeued = requeue_stale_runs()
+        if requeued:
+            logger.warning(f"Requeued {requeued} runs left queued for too long")
+        while self._queue.claimable > 0:
+            limit = min(self._queue.claimable,
+                        constants.SCHEDULER_CLAIM_BATCH_SIZE.value)
+            runs = claim_runs(limit)
+            for run_id, priority in runs:
+                self._queue.push(run_id, priority)
+            if len(runs) < limit:
+                break
+
+    async def _listen(self):
+        """
+        Wakes up the supervisor whenever new runs are announced,
+        or after a slow poll for safety
+        """
+        loop = asyncio.get_running_loop()
         while True:
+            # The listener gets its own thread so it never starves the pool
+            await loop.run_in_executor(
+                None,
+                self._listener.wait,
+                constants.SCHEDULER_FALLBACK_POLL_TIME.value,
+            )
+            self._wakeup.set()
+
+    def _spawn(self, coroutine):
+        """
+        Schedules a coroutine on the event loop, keeping a reference
+        to it until it's done
+        """
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _supervise_run(self, run_id: int):
+        """
+        Executes a run and frees its slot once it's finished. Only runs
+        this daemon started are failed: a run it lost the claim of may be
+        running for another daemon, and runs that failed before starting
+        are requeued once their lease expires.
+        """
+        try:
+            await self._executor.execute(run_id)
+        except RunClaimLost as e:
+            logger.warning(f"Run #{run_id} was not started: {e}")
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error(f"Run #{run_id} could not be executed: {e}")
+            await self._blocking(
+                transition_run,
+                run_id,
+                constants.RUN_STATUS_FAILED.value,
+                from_statuses=[constants.RUN_STATUS_RUNNING.value],
+            )
+        finally:
+            if self._manifest_reporting:
+                self._finished.add(run_id)
+            self._queue.done(run_id)
+            self._wakeup.set()
+
+    async def _apply_results(self):
+        """
+        Applies the result manifests of the runs finished since the last
+        call, all in one batch
+        """
+        if not self._finished:
+            return
+        run_ids = set(self._finished)
+        await self._blocking(apply_result_manifests, sorted(run_ids))
+        # Runs finished meanwhile are kept, and so are all of them if
+        # applying failed, to be retried on the next wakeup
+        self._finished -= run_ids
+
+    async def _supervise(self):
+        """
+        Launches new runs whenever they are announced or a
+        slot frees up
+        """
+        self._listener = RunListener()
+        self._wakeup = asyncio.Event()
+        self._spawn(self._listen())
+        await self._executor.start()
+        if self._manifest_reporting:
             try:
-                # queued_runs = Run.objects.all().filter(
-                #     status__status=constants.RUN_STATUS_QUEUED.value)
-                new_runs = Run.objects.all().filter(
-                    status__status=constants.RUN_STATUS_CREATED.value)
-                # for run in queued_runs | new_runs:
-                for run in new_runs:
-                    logger.info(f"Sending new run ({run}) to the executor")
-                    if not self._scheduler:
-                        self._initialize_scheduler()
-                    if not self._executor:
-                        self._initialize_executor()
-                    self._executor.execute(run.id)
-            except Exception as e:
+                # Results reported while the daemon was down
+                await self._blocking(apply_result_manifests)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Could not apply pending results: {e}")
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._apply_results()
+                await self._blocking(self._claim)
+                for run_id in self._queue.pop_ready():
+                    logger.info(f"Sending new run #{run_id} to the executor")
+                    self._spawn(self._supervise_run(run_id))
+            except Exception as e:  # pylint: disable=broad-except
                 logger.error(f"Error in scheduler: {e}")
-            finally:
-                logger.info(
-                    f"Scheduler sleeping for {constants.SCHEDULER_SLEEP_TIME.value} seconds")
-                time.sleep(constants.SCHEDULER_SLEEP_TIME.value)
+            logger.info("Scheduler waiting for new runs...")
+            await self._wakeup.wait()
+
+    @logger.catch
+    def _threaded_scheduler(self):
+        """
+        Runs the supervisor event loop
+        :return:
+        """
+        asyncio.run(self._supervise())
 
     @logger.catch
     def start_scheduler(self):
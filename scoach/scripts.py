@@ -0,0 +1,91 @@
+"""
+Provides script_cache and compile_template, which keep the training
+scripts downloaded by the daemon and their compiled templates in memory.
+"""
+
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import TYPE_CHECKING
+
+import jinja2
+
+from scoach.constants import constants
+
+if TYPE_CHECKING:
+    from minio import Minio
+
+
+class ScriptCache:
+    """
+    In-memory LRU cache for the scripts downloaded from MinIO, so that
+    many runs of the same script cost a single download. It lives on the
+    daemon, which reads the scripts of the runs before dispatching them.
+    """
+
+    def __init__(
+        self,
+        max_size: int = constants.SCRIPT_CACHE_SIZE.value,
+        revalidate_after: float = constants.SCRIPT_CACHE_REVALIDATE_AFTER.value,
+    ):
+        self._max_size = max_size
+        self._revalidate_after = revalidate_after
+        # path -> (etag, time of the last validation, source)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, minio_client: "Minio", bucket: str, path: str, revalidate: bool = True) -> str:
+        """
+        Gets the source of a script, downloading it only if it's not
+        cached yet or (when revalidating) its ETag has changed. A cached
+        script is revalidated at most once every `revalidate_after` seconds.
+
+        Args:
+            - minio_client (Minio): the client to download the script with
+            - bucket (str): the bucket holding the script
+            - path (str): the path of the script in the bucket
+            - revalidate (bool): whether to check the ETag of a cached script
+
+        Returns:
+            - str: the source of the script
+        """
+        now = time.monotonic()
+        with self._lock:
+            if path in self._entries:
+                etag, validated, source = self._entries[path]
+                if not revalidate or now - validated < self._revalidate_after:
+                    self._entries.move_to_end(path)
+                    return source
+        etag = minio_client.stat_object(bucket, path).etag if revalidate else None
+        with self._lock:
+            if path in self._entries:
+                cached_etag, _, source = self._entries[path]
+                if etag == cached_etag:
+                    self._entries[path] = (etag, now, source)
+                    self._entries.move_to_end(path)
+                    return source
+        response = minio_client.get_object(bucket, path)
+        try:
+            source = response.read().decode("utf-8")
+        finally:
+            response.close()
+            response.release_conn()
+        with self._lock:
+            self._entries[path] = (etag, now, source)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return source
+
+
+script_cache = ScriptCache()
+
+
+@lru_cache(maxsize=constants.SCRIPT_CACHE_SIZE.value)
+def compile_template(template_text: str) -> jinja2.Template:
+    """
+    Compiles a jinja2 template, reusing previous compilations
+    of the same text
+    """
+    return jinja2.Template(template_text)
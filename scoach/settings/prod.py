@@ -13,5 +13,7 @@ DATABASES = {
         "PASSWORD": getenv("DB_PASSWORD"),
         "HOST": getenv("DB_HOST"),
         "PORT": getenv("DB_PORT"),
+        # Opt-in persistent connections, in seconds (0 closes them after each use)
+        "CONN_MAX_AGE": int(getenv("DB_CONN_MAX_AGE", "0")),
     }
 }
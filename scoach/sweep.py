@@ -0,0 +1,154 @@
+"""
+Provides helpers for expanding parameter sweeps and submitting
+their runs in bulk.
+"""
+
+import json
+import math
+import random
+from itertools import product
+from typing import Dict, List
+
+from django.db import transaction
+
+from scoach.constants import constants
+from scoach.notifier import notify_new_runs
+from scoach.runs import get_status_id
+from scoach.utils import (
+    bulk_create_with_ids,
+    config_digest,
+    get_or_create_config,
+)
+
+
+def grid_configs(base_config: dict, axes: Dict[str, list]) -> List[dict]:
+    """
+    Expands a grid search, combining every value of every axis.
+
+    Args:
+        - base_config (dict): the parameters shared by all runs
+        - axes (dict): maps parameter names to the list of values to try
+
+    Returns:
+        - list: one config per point of the grid
+    """
+    for name, values in axes.items():
+        if not isinstance(values, list) or len(values) == 0:
+            raise ValueError(f"Grid axis {name} must be a non-empty list")
+    names = [*axes.keys()]
+    return [
+        {**base_config, **dict(zip(names, values))}
+        for values in product(*axes.values())
+    ]
+
+
+def _sample(name: str, axis, rng: random.Random):
+    """
+    Draws a value for a random search axis
+    """
+    if isinstance(axis, list):
+        return rng.choice(axis)
+    if not isinstance(axis, dict):
+        raise ValueError(f"Random axis {name} must be a list or a dict")
+    distribution = axis.get("distribution", "uniform")
+    low, high = axis["low"], axis["high"]
+    if distribution == "uniform":
+        return rng.uniform(low, high)
+    if distribution == "loguniform":
+        return math.exp(rng.uniform(math.log(low), math.log(high)))
+    if distribution == "randint":
+        return rng.randint(low, high)
+    raise ValueError(f"Unknown distribution for random axis {name}: {distribution}")
+
+
+def random_configs(base_config: dict, axes: dict, samples: int, seed: int = None) -> List[dict]:
+    """
+    Expands a random search.
+
+    Args:
+        - base_config (dict): the parameters shared by all runs
+        - axes (dict): maps parameter names either to a list of values to
+            choose from or to a distribution such as
+            `{"distribution": "loguniform", "low": 1e-4, "high": 1e-1}`
+            (`uniform`, `loguniform` and `randint` are supported)
+        - samples (int): the number of configs to draw
+        - seed (int): seed for reproducible sweeps
+
+    Returns:
+        - list: the sampled configs
+    """
+    rng = random.Random(seed)
+    return [
+        {**base_config, **{name: _sample(name, axis, rng)
+                           for name, axis in axes.items()}}
+        for _ in range(samples)
+    ]
+
+
+def _get_or_create_parameters(configs: List[dict]) -> list:
+    """
+    Gets the Parameters for each config, creating the missing ones in bulk
+    """
+    from scoach.models import Parameters
+    digests = [config_digest(config) for config in configs]
+    unique = dict(zip(digests, configs))
+    existing = {}
+
+    def lookup(lookup_digests: list):
+        for i in range(0, len(lookup_digests), constants.SWEEP_LOOKUP_BATCH_SIZE.value):
+            batch = lookup_digests[i:i + constants.SWEEP_LOOKUP_BATCH_SIZE.value]
+            existing.update(
+                (parameters.digest, parameters)
+                for parameters in Parameters.objects.filter(digest__in=batch)
+            )
+
+    lookup([*unique.keys()])
+    missing = [digest for digest in unique if digest not in existing]
+    if missing:
+        # Concurrent sweeps may insert the same configs first, so conflicts
+        # are skipped and every missing config is selected again
+        Parameters.objects.bulk_create([
+            Parameters(config=json.dumps(unique[digest]), digest=digest)
+            for digest in missing
+        ], ignore_conflicts=True)
+        lookup(missing)
+    return [existing[digest] for digest in digests]
+
+
+def create_runs(script, model_config: dict, configs: List[dict], tags: List[str] = None, priority: int = 0) -> list:
+    """
+    Creates one run per config in a single transaction, inserting
+    parameters, runs and tags in bulk.
+
+    Args:
+        - script (Script): the script shared by all runs
+        - model_config (dict): the model definition shared by all runs
+        - configs (list): the parameters of each run
+        - tags (list): the names of the tags for all runs
+        - priority (int): the priority of all runs
+
+    Returns:
+        - list: the created runs
+    """
+    from scoach.models import Model, Run, Tag
+    with transaction.atomic():
+        model: Model = get_or_create_config(Model, model_config)
+        status_id = get_status_id(constants.RUN_STATUS_CREATED.value)
+        runs = bulk_create_with_ids(Run, [
+            Run(
+                model=model,
+                script=script,
+                parameters=parameters,
+                status_id=status_id,
+                priority=priority,
+            )
+            for parameters in _get_or_create_parameters(configs)
+        ])
+        if tags:
+            tag_objs = [Tag.objects.get_or_create(name=tag)[0] for tag in tags]
+            Run.tags.through.objects.bulk_create([
+                Run.tags.through(run_id=run.id, tag_id=tag.id)
+                for run in runs for tag in tag_objs
+            ])
+        transaction.on_commit(notify_new_runs)
+    return runs
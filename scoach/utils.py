@@ -2,22 +2,32 @@
 General utilities
 """
 
+import io
 import os
-from os.path import join
-from os import makedirs
-from typing import Any
+import json
+import hashlib
+import tempfile
+from os.path import basename, join
+from threading import Lock
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Tuple
 from sys import exit
 
-import yaml
 import typer
-from minio import Minio
-import django
-from django.db import models
-from django.core import management
 
+from scoach.config import get_config, is_config_pinned, read_config_file
 from scoach.constants import constants
+from scoach.db import db_session
 from scoach.logging import logger
 
+# MinIO and Django are only imported when used, so that light CLI
+# commands don't pay for them
+if TYPE_CHECKING:
+    import urllib3
+    from django.db import models
+    from minio import Minio
+
 
 def load_env_as_type(env_name, env_type=str, default=None):
     """
@@ -37,6 +47,53 @@ def load_env_as_type(env_name, env_type=str, default=None):
         raise ValueError("Unknown type: %s" % env_type)
 
 
+_minio_clients: Dict[Tuple, "Minio"] = {}
+_minio_clients_lock = Lock()
+_minio_http_client: "urllib3.PoolManager" = None
+
+
+def _minio_pool_size() -> int:
+    """
+    Gets the number of connections MinIO may need at once: the daemon
+    reads scripts from every thread of its pool while applying result
+    manifests, and load_runs downloads several runs in parts
+    """
+    config = get_config()
+    _, concurrency = _transfer_settings()
+    return max(
+        config.db_pool_size + concurrency,
+        constants.LOAD_RUNS_CONCURRENCY.value * concurrency,
+    )
+
+
+def _get_minio_http_client() -> "urllib3.PoolManager":
+    """
+    Gets the connection pool shared by all MinIO clients of the process,
+    sized so that every thread can keep its own connection alive
+    """
+    # pylint: disable=import-outside-toplevel
+    import certifi
+    import urllib3
+    global _minio_http_client  # pylint: disable=global-statement
+    if _minio_http_client is None:
+        _minio_http_client = urllib3.PoolManager(
+            maxsize=_minio_pool_size(),
+            block=False,
+            timeout=urllib3.Timeout(
+                connect=constants.MINIO_CONNECT_TIMEOUT.value,
+                read=constants.MINIO_READ_TIMEOUT.value,
+            ),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+            retries=urllib3.Retry(
+                total=5,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504],
+            ),
+        )
+    return _minio_http_client
+
+
 def get_minio_client(
     minio_access_key: str = None,
     minio_secret_key: str = None,
@@ -45,30 +102,47 @@ def get_minio_client(
 ):
     """
     Get a Minio client for the given Minio URL and bucket.
+
+    Clients are cached per endpoint and credentials and share a single
+    connection pool, so connections are kept alive between operations.
+    Clients are safe to use from several threads.
     """
-    minio_access_key = minio_access_key or load_env_as_type(
-        constants.MINIO_ACCESS_KEY_ENV.value,
-        str,
-        constants.MINIO_ACCESS_KEY_ENV_DEFAULT.value,
-    )
-    minio_secret_key = minio_secret_key or load_env_as_type(
-        constants.MINIO_SECRET_KEY_ENV.value,
-        str,
-        constants.MINIO_SECRET_KEY_ENV_DEFAULT.value,
-    )
-    minio_url = minio_url or load_env_as_type(
-        constants.MINIO_ENDPOINT_ENV.value,
-        str,
-        constants.MINIO_ENDPOINT_ENV_DEFAULT.value,
-    )
-    minio_bucket = minio_bucket or load_env_as_type(
-        constants.MINIO_BUCKET_ENV.value, str, constants.MINIO_BUCKET_ENV_DEFAULT.value
-    )
+    config = get_config()
+    minio_access_key = minio_access_key or config.minio_access_key
+    minio_secret_key = minio_secret_key or config.minio_secret_key
+    minio_url = minio_url or config.minio_endpoint
+    minio_bucket = minio_bucket or config.minio_bucket
     if not minio_url:
         raise ValueError("Missing Minio URL")
     if not minio_bucket:
         raise ValueError("Missing Minio bucket")
-    return Minio(minio_url, access_key=minio_access_key, secret_key=minio_secret_key)
+    from minio import Minio  # pylint: disable=import-outside-toplevel
+    key = (minio_url, minio_access_key, minio_secret_key)
+    with _minio_clients_lock:
+        minio_client = _minio_clients.get(key)
+        if minio_client is None:
+            minio_client = Minio(
+                minio_url,
+                access_key=minio_access_key,
+                secret_key=minio_secret_key,
+                http_client=_get_minio_http_client(),
+            )
+            _minio_clients[key] = minio_client
+    return minio_client
+
+
+def _reset_minio_clients():
+    """
+    Drops the clients and connections inherited from a parent process,
+    as connections can't be shared with forked children
+    """
+    global _minio_clients_lock, _minio_http_client  # pylint: disable=global-statement
+    _minio_clients.clear()
+    _minio_clients_lock = Lock()
+    _minio_http_client = None
+
+
+os.register_at_fork(after_in_child=_reset_minio_clients)
 
 
 def join_tags(tags: list) -> str:
@@ -93,43 +167,261 @@ def load_config_file_to_envs():
         typer.echo(
             "No config file found. Please run `scoach init` to create one.")
         exit(1)
-    # pylint: disable=unspecified-encoding
-    # pylint: disable=invalid-name
-    with open(constants.SCOACH_DEFAULT_CONFIG_PATH.value, "r") as f:
-        config: dict = yaml.safe_load(f)
-    for key, value in config.items():
+    # Only parsed again when the file changes
+    for key, value in read_config_file().items():
         os.environ[key] = str(value)
 
 
-def save_to_minio(minio_client: Minio, file_path: str, file_name: str):
+def _transfer_settings() -> Tuple[int, int]:
+    """
+    Loads the part size and the number of parallel parts for transfers
     """
-    Save a file to MinIO
+    config = get_config()
+    return config.minio_part_size, max(config.minio_transfer_concurrency, 1)
+
+
+def save_to_minio(minio_client: "Minio", file_path: str, file_name: str):
     """
+    Save a file to MinIO, uploading its parts in parallel
+    """
+    part_size, concurrency = _transfer_settings()
     minio_client.fput_object(
-        load_env_as_type(
-            constants.MINIO_BUCKET_ENV.value,
-            default=constants.MINIO_BUCKET_ENV_DEFAULT.value,
-        ),
+        get_config().minio_bucket,
         file_path,
         file_name,
+        part_size=part_size,
+        num_parallel_uploads=concurrency,
     )
 
 
-def download_from_minio(minio_client: Minio, file_path: str, file_name: str):
+def _download_range(minio_client: "Minio", bucket: str, file_path: str, fd: int, offset: int, length: int):
     """
-    Download a file from MinIO
+    Downloads a byte range of an object into the same range of a file
     """
-    minio_client.fget_object(
-        load_env_as_type(
-            constants.MINIO_BUCKET_ENV.value,
-            default=constants.MINIO_BUCKET_ENV_DEFAULT.value,
-        ),
-        file_path,
-        file_name,
-    )
+    response = minio_client.get_object(bucket, file_path, offset, length)
+    try:
+        for chunk in response.stream(constants.MINIO_STREAM_CHUNK_SIZE.value):
+            offset += os.pwrite(fd, chunk, offset)
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def download_from_minio(minio_client: "Minio", file_path: str, file_name: str):
+    """
+    Download a file from MinIO, fetching its parts in parallel with
+    ranged requests written straight to their place in the file
+    """
+    bucket = get_config().minio_bucket
+    part_size, concurrency = _transfer_settings()
+    size = minio_client.stat_object(bucket, file_path).size
+    fd = os.open(file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        ranges = [
+            (offset, min(part_size, size - offset))
+            for offset in range(0, size, part_size)
+        ]
+        if len(ranges) <= 1 or concurrency == 1:
+            for offset, length in ranges:
+                _download_range(minio_client, bucket, file_path, fd, offset, length)
+        else:
+            with ThreadPoolExecutor(min(concurrency, len(ranges))) as pool:
+                futures = [
+                    pool.submit(_download_range, minio_client,
+                                bucket, file_path, fd, offset, length)
+                    for offset, length in ranges
+                ]
+                for future in futures:
+                    future.result()
+    except BaseException:
+        os.close(fd)
+        os.remove(file_name)
+        raise
+    os.close(fd)
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Computes the SHA-256 digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:  # pylint: disable=invalid-name
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def canonical_json(obj: Any) -> str:
+    """
+    Serializes an object to JSON with sorted keys and no whitespace,
+    so that equal objects always have the same representation.
+    """
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+def config_digest(config: Any) -> str:
+    """
+    Computes the SHA-256 digest of a config's canonical JSON.
+    """
+    return hashlib.sha256(canonical_json(config).encode("utf-8")).hexdigest()
+
+
+def get_or_create_config(T: "models.Model", config: dict):
+    """
+    Gets the Model or Parameters holding a config, creating it if needed.
+    Configs are matched by digest, so key order doesn't matter.
+    """
+    from django.db import IntegrityError, transaction
+    digest = config_digest(config)
+    obj = safe_object_get(T, digest=digest)
+    if obj is not None:
+        return obj
+    try:
+        with transaction.atomic():
+            return T.objects.create(config=json.dumps(config), digest=digest)
+    except IntegrityError:
+        # Someone else created the same config in the meantime
+        return T.objects.get(digest=digest)
+
+
+def backfill_config_digests():
+    """
+    Computes the digest of configs stored before digests existed. Rows
+    duplicating an already digested config are left without a digest.
+    """
+    from scoach.models import Model, Parameters
+    for T in (Model, Parameters):
+        seen = set(T.objects.exclude(digest=None).values_list("digest", flat=True))
+        pending = []
+        for obj in T.objects.filter(digest=None).exclude(config=None).only("id", "config").iterator():
+            try:
+                digest = config_digest(json.loads(obj.config))
+            except ValueError:
+                continue
+            if digest in seen:
+                continue
+            seen.add(digest)
+            obj.digest = digest
+            pending.append(obj)
+            if len(pending) == constants.BACKFILL_BATCH_SIZE.value:
+                T.objects.bulk_update(pending, ["digest"])
+                pending = []
+        T.objects.bulk_update(pending, ["digest"])
+
+
+def dedupe_names():
+    """
+    Merges the statuses and tags sharing a name, which older versions
+    could create, so their names can be made unique. Runs are moved to
+    the oldest status or tag of each name.
+    """
+    from django.db import connection, transaction
+    from django.db.models import Count, Min
+    from scoach.models import Run, Status, Tag
+    tables = connection.introspection.table_names()
+    through = Run.tags.through
+    with transaction.atomic():
+        if Status._meta.db_table in tables:
+            duplicated = Status.objects.values("status").annotate(
+                count=Count("id"), keep=Min("id")).filter(count__gt=1)
+            for row in duplicated:
+                duplicates = [*Status.objects.filter(status=row["status"]).exclude(
+                    id=row["keep"]).values_list("id", flat=True)]
+                # Runs are moved first, so deleting cascades to none of them
+                Run.objects.filter(status_id__in=duplicates).update(status_id=row["keep"])
+                Status.objects.filter(id__in=duplicates).delete()
+        if Tag._meta.db_table in tables:
+            duplicated = Tag.objects.values("name").annotate(
+                count=Count("id"), keep=Min("id")).filter(count__gt=1)
+            for row in duplicated:
+                duplicates = [*Tag.objects.filter(name=row["name"]).exclude(
+                    id=row["keep"]).values_list("id", flat=True)]
+                run_ids = set(through.objects.filter(
+                    tag_id__in=duplicates).values_list("run_id", flat=True))
+                run_ids -= set(through.objects.filter(
+                    tag_id=row["keep"], run_id__in=run_ids).values_list("run_id", flat=True))
+                through.objects.bulk_create([
+                    through(run_id=run_id, tag_id=row["keep"]) for run_id in run_ids
+                ])
+                Tag.objects.filter(id__in=duplicates).delete()
+
+
+def get_or_upload_script(file_path: str):
+    """
+    Gets the script matching the contents of a local file, uploading
+    it to MinIO only if it was never uploaded before.
+    """
+    from django.db import IntegrityError
+    from scoach.models import Script
+    digest = file_digest(file_path)
+    script: Script = safe_object_get(Script, digest=digest)
+    if script is not None:
+        return script
+    minio_script_path = join(
+        constants.SCRIPTS_PATH_PREFIX.value, digest, basename(file_path))
+    save_to_minio(get_minio_client(), minio_script_path, file_path)
+    try:
+        return Script.objects.create(path=minio_script_path, digest=digest)
+    except IntegrityError:
+        # Someone else uploaded the same script in the meantime
+        return Script.objects.get(digest=digest)
 
 
-def safe_object_get(T: models.Model, **kwargs):
+class RunLogWriter:
+    """
+    Uploads the output of a run to MinIO in rolling parts of at most
+    `part_size` bytes, named `logs/<run_id>/<stream>.<part>.log`
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        minio_client: "Minio",
+        bucket: str,
+        run_id: Any,
+        stream: str,
+        part_size: int = constants.RUN_LOG_PART_SIZE.value,
+    ):
+        self._minio_client = minio_client
+        self._bucket = bucket
+        self._prefix = join(constants.LOGS_PATH_PREFIX.value, str(run_id))
+        self._stream = stream
+        self._part_size = part_size
+        self._part = 0
+        self._buffer = bytearray()
+
+    def _upload(self, data: bytes):
+        """
+        Uploads the next part of the log
+        """
+        path = join(self._prefix, f"{self._stream}.{self._part:05d}.log")
+        self._part += 1
+        try:
+            self._minio_client.put_object(
+                self._bucket, path, io.BytesIO(data), len(data))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"Could not upload log part {path}: {e}")
+
+    def write(self, text: str):
+        """
+        Appends output to the log, uploading every part that is full
+        """
+        self._buffer += text.encode("utf-8")
+        while len(self._buffer) >= self._part_size:
+            self._upload(bytes(self._buffer[:self._part_size]))
+            del self._buffer[:self._part_size]
+
+    def flush(self):
+        """
+        Uploads whatever output is buffered as a (smaller) part
+        """
+        if self._buffer:
+            self._upload(bytes(self._buffer))
+            self._buffer.clear()
+
+
+def safe_object_get(T: "models.Model", **kwargs):
     """
     Safely get an object from the database.
     """
@@ -139,6 +431,59 @@ def safe_object_get(T: models.Model, **kwargs):
         return None
 
 
+def bulk_create_with_ids(T: "models.Model", objs: list) -> list:
+    """
+    Creates objects in bulk, making sure their ids are set. Backends that
+    can't return ids from bulk inserts save each object instead.
+    """
+    from django.db import connection
+    if connection.features.can_return_rows_from_bulk_insert:
+        return T.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save()
+    return objs
+
+
+def iter_keyset(
+    queryset: "models.QuerySet",
+    chunk_size: int = constants.LIST_CHUNK_SIZE.value,
+    after_id: int = None,
+    offset: int = 0,
+    limit: int = None,
+) -> Iterator["models.Model"]:
+    """
+    Streams the objects of a queryset by increasing id, in chunks fetched
+    with keyset pagination. Unlike `QuerySet.iterator()` in Django 3.2,
+    `prefetch_related` is honored for every chunk, and memory stays
+    bounded by the chunk size.
+
+    Args:
+        - queryset (QuerySet): the objects to stream
+        - chunk_size (int): how many objects to fetch per query
+        - after_id (int): only stream objects with a greater id
+        - offset (int): how many objects to skip
+        - limit (int): the maximum number of objects to stream
+    """
+    queryset = queryset.order_by("id")
+    if offset > 0:
+        skipped = queryset if after_id is None else queryset.filter(id__gt=after_id)
+        # The last skipped id is the key of the first chunk
+        after_id = skipped.values_list("id", flat=True)[offset - 1:offset].first()
+        if after_id is None:
+            return
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        chunk = queryset if after_id is None else queryset.filter(id__gt=after_id)
+        objs = [*chunk[:size]]
+        yield from objs
+        if len(objs) < size:
+            return
+        after_id = objs[-1].id
+        if remaining is not None:
+            remaining -= len(objs)
+
+
 def safe_cast(value: str, to_type: type, default: Any = None):
     """
     Safely cast a value to a given type.
@@ -149,11 +494,22 @@ def safe_cast(value: str, to_type: type, default: Any = None):
         return default
 
 
-def save_run(run_id: str, model, train_score: float, validation_score: float):
+def save_run(run_id: str, model, train_score: float, validation_score: float, codec: str = "h5"):
     """
     Save a run to the database.
+
+    The weights are stored with the given codec: `h5` (default),
+    `h5+zstd` (compressed), or `float16` / `bfloat16` (reduced precision,
+    for runs that only need inference-quality weights).
+
+    With `SCOACH_RESULT_REPORTING: manifest`, the results are written to
+    MinIO instead, and the daemon applies them to the database, so
+    compute nodes never connect to it.
+
+    The checkpoints of the run are removed once its results are stored.
     """
-    from scoach.models import Run, Weights
+    from scoach.checkpoints import remove_checkpoints
+    from scoach.results import is_manifest_reporting, write_result_manifest
     # Cast types
     train_score = safe_cast(train_score, float, None)
     if train_score is None:
@@ -161,66 +517,199 @@ def save_run(run_id: str, model, train_score: float, validation_score: float):
     validation_score = safe_cast(validation_score, float, None)
     if validation_score is None:
         raise ValueError("Validation score is not a float")
+    if is_manifest_reporting():
+        weights_path = _upload_weights(run_id, model, codec)
+        write_result_manifest(
+            get_minio_client(), run_id, train_score, validation_score, weights_path, codec)
+    else:
+        _save_run_to_database(run_id, model, train_score, validation_score, codec)
+    # Only needed until the results are stored
+    remove_checkpoints(run_id)
+
+
+@db_session
+def _save_run_to_database(run_id: str, model, train_score: float, validation_score: float, codec: str):
+    """
+    Save a run to the database, within a single database session
+    """
+    from scoach.models import Run
     # Ensure run exists
-    run = safe_object_get(Run, id=run_id)
-    if run is None:
+    if not Run.objects.filter(id=run_id).exists():
         raise ValueError(f"Run #{run_id} does not exist")
+    weights_path = _upload_weights(run_id, model, codec)
+    _store_run_results(run_id, train_score, validation_score, weights_path, codec)
+
+
+def _upload_weights(run_id: str, model, codec: str) -> str:
+    """
+    Save the weights of a run to MinIO
+
+    Returns:
+        - str: the path of the weights in MinIO
+    """
+    from scoach.weight_codecs import get_codec, save_weights
     # Generate unique weights_path
-    weights_path = join(constants.WEIGHTS_PATH_PREFIX.value, f"{run_id}.h5")
-    tmp_weights_file = join("/tmp/", weights_path)
-    makedirs(tmp_weights_file.rsplit("/", 1)[0], exist_ok=True)
-    # Save weights locally
-    model.save_weights(tmp_weights_file)
-    # Save weights on MinIO
-    minio_client = get_minio_client()
-    save_to_minio(minio_client, weights_path, tmp_weights_file)
-    # Save run on DB
-    run: Run = safe_object_get(Run, id=run_id)
-    if run:
-        run.train_score = train_score
-        run.validation_score = validation_score
-        weights: Weights = Weights.objects.create(
-            path=weights_path,
-        )
-        weights.save()
-        run.weights = weights
-        run.save()
-    else:
-        raise ValueError("Run does not exist")
+    weights_path = join(constants.WEIGHTS_PATH_PREFIX.value,
+                        f"{run_id}.{get_codec(codec).extension}")
+    # Keras can only write weights to a file, so stage them in a private
+    # directory and upload it in parallel parts
+    with tempfile.TemporaryDirectory(prefix="scoach-") as tmp_dir:
+        tmp_weights_file = join(tmp_dir, basename(weights_path))
+        # Save weights locally
+        save_weights(model, tmp_weights_file, codec)
+        # Save weights on MinIO
+        save_to_minio(get_minio_client(), weights_path, tmp_weights_file)
+    return weights_path
+
+
+def _store_run_results(run_id: str, train_score: float, validation_score: float, weights_path: str, codec: str):
+    """
+    Save the scores and weights of a run on the database. Only these
+    columns are updated, so concurrent transitions of the run are kept.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from scoach.models import Run, Weights
+    with transaction.atomic():
+        weights: Weights = Weights.objects.create(path=weights_path, codec=codec)
+        # update() skips auto_now
+        if not Run.objects.filter(id=run_id).update(
+            train_score=train_score,
+            validation_score=validation_score,
+            weights=weights,
+            date_modified=timezone.now(),
+        ):
+            raise ValueError("Run does not exist")
+
+
+def _cached_weights(run, minio_client: "Minio"):
+    """
+    Opens the weights of a run through the local cache, downloading
+    them from MinIO on a miss
+    """
+    # pylint: disable=import-outside-toplevel
+    from scoach.cache import weights_cache, weights_cache_key
+    from scoach.weight_codecs import get_codec
+    return weights_cache.open(
+        weights_cache_key(run.weights.id),
+        lambda tmp_weights_file: download_from_minio(
+            minio_client, run.weights.path, tmp_weights_file),
+        extension=get_codec(run.weights.codec).extension,
+    )
 
 
-def load_run(run_id: str):
+def _build_model(run, weights_file: str):
     """
-    Load a run from the database.
+    Builds the model of a run and loads its weights
     """
     # pylint: disable=no-name-in-module
     # pylint: disable=import-outside-toplevel
     from tensorflow.keras.models import model_from_json
-    from scoach.models import Run, Weights
+    from scoach.weight_codecs import load_weights
+    model = model_from_json(run.model.config)
+    load_weights(model, weights_file, run.weights.codec)
+    return model
+
+
+def load_run(run_id: str):
+    """
+    Load a run from the database.
+    """
+    from scoach.models import Run
 
     run: Run = safe_object_get(Run, id=run_id)
     if run:
-        weights: Weights = run.weights
-        weights_path = weights.path
-        # Download weights from MinIO
-        minio_client = get_minio_client()
-        tmp_weights_file = join("/tmp/", weights_path)
-        download_from_minio(minio_client, weights_path,
-                            tmp_weights_file)
-        # Load weights locally
-        model = model_from_json(run.model.config)
-        model.load_weights(tmp_weights_file)
-        # Remove weights locally
-        os.remove(join("/tmp/", weights_path))
-        return model
+        # Download weights from MinIO, unless they are cached locally
+        with _cached_weights(run, get_minio_client()) as weights_file:
+            return _build_model(run, weights_file)
     else:
         raise ValueError("Run not found")
 
 
+def _iter_loaded_runs(runs: list) -> Iterator[Tuple[Any, Any]]:
+    """
+    Downloads the weights of several runs concurrently, building each
+    model in the calling thread as soon as its weights are available.
+    At most `LOAD_RUNS_CONCURRENCY` downloads are pending at once.
+    """
+    minio_client = get_minio_client()
+    concurrency = constants.LOAD_RUNS_CONCURRENCY.value
+
+    def fetch(run):
+        cached_weights = _cached_weights(run, minio_client)
+        # Entered here and exited by the caller, once the model is built
+        return run, cached_weights, cached_weights.__enter__()
+
+    pending = iter(runs)
+    futures = set()
+    with ThreadPoolExecutor(concurrency) as pool:
+        try:
+            futures.update(pool.submit(fetch, run)
+                           for run in islice(pending, concurrency))
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                futures.remove(future)
+                run, cached_weights, weights_file = future.result()
+                try:
+                    model = _build_model(run, weights_file)
+                finally:
+                    cached_weights.__exit__(None, None, None)
+                futures.update(pool.submit(fetch, next_run)
+                               for next_run in islice(pending, 1))
+                yield run, model
+        finally:
+            # Release the weights fetched for a consumer that stopped early
+            for future in futures:
+                if not future.cancel() and future.exception() is None:
+                    future.result()[1].__exit__(None, None, None)
+
+
+def load_runs(runs, lazy: bool = False):
+    """
+    Load several runs at once, e.g. to evaluate an ensemble.
+
+    The metadata of all runs is fetched in a single query and their
+    weights are downloaded concurrently.
+
+    Args:
+        - runs: the ids of the runs, or a queryset of runs
+        - lazy (bool): if True, (run, model) pairs are yielded as soon as
+            each model is ready, so only a few models are in memory at
+            once when the consumer discards them
+
+    Returns:
+        - dict: maps the id of each run to its model, in the given order,
+            or a generator of (run, model) pairs if lazy
+    """
+    from django.db.models import QuerySet
+    from scoach.models import Run
+
+    if isinstance(runs, QuerySet):
+        runs = [*runs.select_related("model", "weights")]
+    else:
+        run_ids = [int(run_id) for run_id in runs]
+        found = Run.objects.select_related("model", "weights").in_bulk(run_ids)
+        missing = [run_id for run_id in run_ids if run_id not in found]
+        if missing:
+            raise ValueError(f"Runs not found: {missing}")
+        runs = [found[run_id] for run_id in run_ids]
+    without_weights = [run.id for run in runs if run.weights is None]
+    if without_weights:
+        raise ValueError(f"Runs without weights: {without_weights}")
+    loaded = _iter_loaded_runs(runs)
+    if lazy:
+        return loaded
+    models_by_id = {run.id: model for run, model in loaded}
+    return {run.id: models_by_id[run.id] for run in runs}
+
+
 def setup_django():
-    load_config_file_to_envs()
-    mode = os.getenv(constants.DJANGO_SETTINGS_MODE_ENV.value,
-                     constants.DJANGO_SETTINGS_MODE_ENV_DEFAULT.value)
+    import django  # pylint: disable=import-outside-toplevel
+    # Workers get their settings from the daemon instead
+    if not is_config_pinned():
+        load_config_file_to_envs()
+    mode = get_config().django_settings_mode
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', f'scoach.settings.{mode}')
     try:
         django.setup()
@@ -244,7 +733,11 @@ def parse_parameters(params: dict):
 
 
 def setup_database():
+    from django.core import management  # pylint: disable=import-outside-toplevel
     setup_django()
     management.execute_from_command_line(
         ['manage.py', 'makemigrations', 'scoach'])
+    # Names must be unique before their constraints are added
+    dedupe_names()
     management.execute_from_command_line(['manage.py', 'migrate'])
+    backfill_config_digests()
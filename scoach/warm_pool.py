@@ -0,0 +1,243 @@
+"""
+Provides WarmInterpreterPool, a warm interpreter that has the heavy
+modules (TensorFlow, Django, scoach) already imported and forks a fresh
+child for each training script, so runs don't pay the interpreter
+startup and imports every time.
+"""
+
+import os
+import sys
+import atexit
+import json
+import runpy
+import shutil
+import select
+import signal
+import socket
+import tempfile
+import threading
+import traceback
+import subprocess
+from importlib import import_module
+from multiprocessing.reduction import recvfds, sendfds
+from os.path import dirname, join
+from threading import Lock
+
+from scoach.constants import constants
+
+
+class WarmPoolUnavailable(RuntimeError):
+    """
+    Raised when the warm interpreter can't take a script, which can
+    then be run in a new interpreter instead
+    """
+
+
+def _exit_code(status: int) -> int:
+    """
+    Converts a wait status into an exit code, negative if the
+    process was killed by a signal (like subprocess does)
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _run_script(script_path: str, cwd: str, stdout_fd: int, stderr_fd: int):
+    """
+    Runs a script as `__main__` in the current, freshly forked,
+    process and exits with its exit code
+    """
+    stdin_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(stdin_fd, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    for fd in (stdin_fd, stdout_fd, stderr_fd):
+        os.close(fd)
+    sys.stdout = open(1, "w", buffering=1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+    os.chdir(cwd)
+    sys.argv = [script_path]
+    code = 0
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:  # pylint: disable=broad-except
+        traceback.print_exc()
+        code = 1
+    finally:
+        # Like a normal interpreter exit, wait for threads (e.g. background
+        # checkpoint uploads) and run the exit handlers
+        try:
+            threading._shutdown()  # pylint: disable=protected-access
+            atexit._run_exitfuncs()  # pylint: disable=protected-access
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+    os._exit(code)  # pylint: disable=protected-access
+
+
+def _handle(server: socket.socket, conn: socket.socket):
+    """
+    Handles a request to run a script. A supervisor is forked to run the
+    script in a child of its own and report the exit code back, so the
+    warm interpreter never has to wait for runs.
+    """
+    stdout_fd, stderr_fd = recvfds(conn, 2)
+    with conn.makefile("rb") as request_file:
+        request = json.loads(request_file.readline())
+    if os.fork() == 0:
+        server.close()
+        # Scripts (and the supervisor) must be able to wait for children
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            _run_script(request["script"], request["cwd"], stdout_fd, stderr_fd)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+        _, status = os.waitpid(pid, 0)
+        conn.sendall(str(_exit_code(status)).encode())
+        conn.close()
+        os._exit(0)  # pylint: disable=protected-access
+    os.close(stdout_fd)
+    os.close(stderr_fd)
+    conn.close()
+
+
+def _preload_modules() -> list:
+    """
+    Gets the modules for the warm interpreter to import. The ones set up
+    from the config file are left to the scripts when the settings come
+    from the daemon or the node has no config file.
+    """
+    # pylint: disable=import-outside-toplevel
+    from scoach.config import is_config_pinned
+    modules = [*constants.WARM_POOL_PRELOAD_MODULES.value]
+    if not is_config_pinned() and constants.SCOACH_DEFAULT_CONFIG_PATH.value.exists():
+        modules.extend(constants.WARM_POOL_CONFIG_MODULES.value)
+    return modules
+
+
+def serve(socket_path: str, modules: list):
+    """
+    Runs the warm interpreter: imports the heavy modules once, then
+    serves requests on a unix socket until its parent goes away
+    (signaled by EOF on stdin)
+    """
+    # Whatever the imports print must not be taken for the handshake
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    for module in modules:
+        try:
+            import_module(module)
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            # Scripts will import it (and fail) on their own
+            pass
+    sys.stdout = stdout
+    # Supervisors are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    print("ready", flush=True)
+    with open(os.devnull, "w") as devnull:  # pylint: disable=unspecified-encoding
+        os.dup2(devnull.fileno(), 1)
+    try:
+        while True:
+            readable, _, _ = select.select([server, sys.stdin], [], [])
+            if sys.stdin in readable:
+                break
+            conn, _ = server.accept()
+            _handle(server, conn)
+    finally:
+        server.close()
+        shutil.rmtree(dirname(socket_path), ignore_errors=True)
+
+
+class WarmInterpreterPool:
+    """
+    Client for the warm interpreter, which is started on first use and
+    lives as long as the current process
+    """
+
+    def __init__(self):
+        self._process: subprocess.Popen = None
+        self._socket_path: str = None
+        self._lock = Lock()
+
+    def _ensure_started(self):
+        """
+        Starts the warm interpreter if it's not running
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+            self._socket_path = join(
+                tempfile.mkdtemp(prefix="scoach-"), "warm_pool.sock")
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "scoach.warm_pool",
+                 self._socket_path, *_preload_modules()],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            )
+            for line in self._process.stdout:
+                if line.strip() == "ready":
+                    return
+            # It exited before it was ready, so it's started again next time
+            self._stop()
+            raise WarmPoolUnavailable("Warm interpreter failed to start")
+
+    def _stop(self):
+        """
+        Kills the warm interpreter and forgets about it
+        """
+        self._process.kill()
+        self._process.wait()
+        self._process = None
+        shutil.rmtree(dirname(self._socket_path), ignore_errors=True)
+
+    def run(self, script_path: str, stdout_fd: int, stderr_fd: int) -> int:
+        """
+        Runs a script in a fresh child of the warm interpreter, blocking
+        until it exits
+
+        Args:
+            - script_path (str): the path of the script to run
+            - stdout_fd (int): file descriptor for the script's stdout
+            - stderr_fd (int): file descriptor for the script's stderr
+
+        Returns:
+            - int: the exit code of the script
+
+        Raises:
+            - WarmPoolUnavailable: if the script couldn't be handed over
+        """
+        self._ensure_started()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            try:
+                conn.connect(self._socket_path)
+            except OSError as e:
+                raise WarmPoolUnavailable(e) from e
+            sendfds(conn, [stdout_fd, stderr_fd])
+            conn.sendall(json.dumps(
+                {"script": script_path, "cwd": os.getcwd()}).encode() + b"\n")
+            response = b""
+            for chunk in iter(lambda: conn.recv(64), b""):
+                response += chunk
+        if not response:
+            raise RuntimeError(f"Warm interpreter lost track of {script_path}")
+        return int(response)
+
+
+warm_pool = WarmInterpreterPool()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,150 @@
+"""
+Provides the storage codecs for the weights of a run: plain HDF5,
+zstd-compressed HDF5 and reduced-precision (float16 or bfloat16) arrays.
+"""
+
+import os
+import tempfile
+from os.path import join
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+
+from scoach.constants import constants
+
+
+class Codec(NamedTuple):
+    """
+    How weights are written to, and read from, a file
+    """
+    extension: str
+    save: Callable
+    load: Callable
+
+
+def _save_h5(model, path: str):
+    model.save_weights(path)
+
+
+def _load_h5(model, path: str):
+    # Keras picks the format from the extension
+    if path.endswith(".h5"):
+        model.load_weights(path)
+        return
+    with tempfile.TemporaryDirectory(prefix="scoach-") as tmp_dir:
+        tmp_weights_file = join(tmp_dir, "weights.h5")
+        os.symlink(os.path.abspath(path), tmp_weights_file)
+        model.load_weights(tmp_weights_file)
+
+
+def _zstandard():
+    """
+    Imports zstandard, which is only needed for compressed weights
+    """
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(
+            "zstd-compressed weights need the zstandard package, "
+            "install scoach with the `zstd` extra") from e
+    return zstandard
+
+
+def _save_h5_zstd(model, path: str):
+    zstandard = _zstandard()
+    with tempfile.TemporaryDirectory(prefix="scoach-") as tmp_dir:
+        tmp_weights_file = join(tmp_dir, "weights.h5")
+        model.save_weights(tmp_weights_file)
+        compressor = zstandard.ZstdCompressor(
+            level=constants.WEIGHTS_ZSTD_LEVEL.value, threads=-1)
+        with open(tmp_weights_file, "rb") as source, open(path, "wb") as target:
+            compressor.copy_stream(source, target)
+
+
+def _load_h5_zstd(model, path: str):
+    zstandard = _zstandard()
+    with tempfile.TemporaryDirectory(prefix="scoach-") as tmp_dir:
+        tmp_weights_file = join(tmp_dir, "weights.h5")
+        with open(path, "rb") as source, open(tmp_weights_file, "wb") as target:
+            zstandard.ZstdDecompressor().copy_stream(source, target)
+        model.load_weights(tmp_weights_file)
+
+
+def to_bfloat16(array: np.ndarray) -> np.ndarray:
+    """
+    Truncates float32 values to bfloat16, rounding to the nearest even,
+    stored as uint16 since NumPy has no bfloat16 type
+    """
+    values = np.ascontiguousarray(array, dtype=np.float32)
+    bits = values.view(np.uint32)
+    rounding = np.uint32(0x7FFF) + ((bits >> 16) & 1)
+    # NaNs must stay NaNs, whatever their payload
+    rounded = np.where(np.isnan(values), bits | 0x00400000, bits + rounding)
+    return (rounded >> 16).astype(np.uint16)
+
+
+def from_bfloat16(array: np.ndarray) -> np.ndarray:
+    """
+    Expands bfloat16 values, stored as uint16, back to float32
+    """
+    return (array.astype(np.uint32) << 16).view(np.float32)
+
+
+def _save_arrays(model, path: str, cast: Callable):
+    with open(path, "wb") as f:  # pylint: disable=invalid-name
+        np.savez(f, *[
+            cast(weights) if np.issubdtype(weights.dtype, np.floating) else weights
+            for weights in model.get_weights()
+        ])
+
+
+def _load_arrays(model, path: str):
+    with np.load(path) as arrays:
+        stored = [arrays[f"arr_{i}"] for i in range(len(arrays.files))]
+    model.set_weights([
+        from_bfloat16(weights).astype(target.dtype)
+        if weights.dtype == np.uint16 and np.issubdtype(target.dtype, np.floating)
+        else weights.astype(target.dtype)
+        for weights, target in zip(stored, model.get_weights())
+    ])
+
+
+def _save_float16(model, path: str):
+    _save_arrays(model, path, lambda weights: weights.astype(np.float16))
+
+
+def _save_bfloat16(model, path: str):
+    _save_arrays(model, path, to_bfloat16)
+
+
+CODECS: Dict[str, Codec] = {
+    "h5": Codec("h5", _save_h5, _load_h5),
+    "h5+zstd": Codec("h5.zst", _save_h5_zstd, _load_h5_zstd),
+    "float16": Codec("f16.npz", _save_float16, _load_arrays),
+    "bfloat16": Codec("bf16.npz", _save_bfloat16, _load_arrays),
+}
+
+
+def get_codec(name: str) -> Codec:
+    """
+    Gets a weights codec by name
+    """
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(
+            f"Unknown weights codec: {name} (available: {', '.join(CODECS)})")
+    return codec
+
+
+def save_weights(model, path: str, codec: str = "h5"):
+    """
+    Saves the weights of a model to a file with the given codec
+    """
+    get_codec(codec).save(model, path)
+
+
+def load_weights(model, path: str, codec: str = "h5"):
+    """
+    Loads weights saved with the given codec into a model
+    """
+    get_codec(codec).load(model, path)
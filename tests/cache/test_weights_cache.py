@@ -0,0 +1,112 @@
+import os
+import threading
+
+import pytest
+
+from scoach.cache import WeightsCache, weights_cache_key
+
+
+class Fetcher:
+    def __init__(self, size):
+        self.size = size
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        with open(path, "wb") as f:
+            f.write(b"w" * self.size)
+
+
+def test_repeat_loads_are_local(tmp_path):
+    cache = WeightsCache(tmp_path, max_size=1000)
+    fetch = Fetcher(100)
+    with cache.open("1", fetch) as first:
+        assert os.path.getsize(first) == 100
+    with cache.open("1", fetch) as second:
+        assert second == first
+    assert fetch.calls == 1
+
+
+def test_cached_entries_are_read_concurrently(tmp_path):
+    cache = WeightsCache(tmp_path, max_size=1000)
+    fetch = Fetcher(100)
+    with cache.open("1", fetch):
+        pass
+    reading = threading.Event()
+    read = threading.Event()
+
+    def read_too():
+        reading.wait()
+        with cache.open("1", fetch):
+            read.set()
+
+    reader = threading.Thread(target=read_too)
+    reader.start()
+    with cache.open("1", fetch):
+        reading.set()
+        # Readers of a cached entry only share its lock
+        assert read.wait(5)
+    reader.join()
+    assert fetch.calls == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = WeightsCache(tmp_path, max_size=250)
+    fetch = Fetcher(100)
+    for key in ("1", "2"):
+        with cache.open(key, fetch):
+            pass
+    # Entry 2 is the least recently used
+    os.utime(tmp_path / "2.h5", (0, 0))
+    with cache.open("1", fetch):
+        pass
+    with cache.open("3", fetch):
+        pass
+    assert sorted(path.name for path in tmp_path.glob("*.h5")) == ["1.h5", "3.h5"]
+    assert fetch.calls == 3
+    # The lock of the evicted entry went with it
+    assert sorted(path.name for path in tmp_path.glob("?.lock")) == ["1.lock", "3.lock"]
+
+
+def test_entries_keep_the_extension_of_their_codec(tmp_path):
+    cache = WeightsCache(tmp_path, max_size=150)
+    fetch = Fetcher(100)
+    with cache.open("1", fetch, extension="h5.zst") as path:
+        assert path.endswith("1.h5.zst")
+    # Evicted like any other entry
+    with cache.open("2", fetch, extension="f16.npz"):
+        pass
+    assert sorted(path.name for path in tmp_path.iterdir() if not path.name.startswith(".")) == [
+        "2.f16.npz", "2.lock"]
+
+
+def test_keys_tell_databases_apart(monkeypatch):
+    from django.db import connection
+    key = weights_cache_key(1)
+    assert weights_cache_key(1) == key
+    assert weights_cache_key(2) != key
+    monkeypatch.setitem(connection.settings_dict, "NAME", "another database")
+    assert weights_cache_key(1) != key
+
+
+def test_entries_in_use_are_not_evicted(tmp_path):
+    cache = WeightsCache(tmp_path, max_size=0)
+    fetch = Fetcher(100)
+    with cache.open("1", fetch) as path:
+        # Nobody can evict it while it's read
+        cache.evict()
+        assert os.path.exists(path)
+    assert not os.path.exists(path)
+
+
+def test_failed_fetches_leave_no_entry(tmp_path):
+    cache = WeightsCache(tmp_path, max_size=1000)
+
+    def fetch(path):
+        raise OSError("connection lost")
+
+    with pytest.raises(OSError):
+        with cache.open("1", fetch):
+            pass
+    assert [*tmp_path.glob("*.h5")] == []
+    assert [*tmp_path.glob("*.part")] == []
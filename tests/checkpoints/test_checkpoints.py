@@ -0,0 +1,44 @@
+from threading import Event
+
+from scoach import checkpoints, config, utils
+from scoach.constants import constants
+
+from tests.conftest import FakeModel
+
+
+def test_checkpoints_keep_the_latest(minio_client):
+    assert checkpoints.load_checkpoint(7, FakeModel()) is None
+    for step in range(1, 6):
+        checkpoints.save_checkpoint(7, FakeModel(f"step {step}".encode()), step, keep=2)
+        checkpoints.wait_for_checkpoints()
+    assert sorted(minio_client.objects) == [
+        "checkpoints/7/0000000004.h5", "checkpoints/7/0000000005.h5"]
+    assert checkpoints.latest_checkpoint(7) == (5, "checkpoints/7/0000000005.h5")
+    model = FakeModel()
+    assert checkpoints.load_checkpoint(7, model) == 5
+    assert model.state == b"step 5"
+
+
+def test_pending_checkpoints_are_superseded(minio_client):
+    # Keep the uploader busy
+    release = Event()
+    checkpoints._uploader.submit(release.wait)  # pylint: disable=protected-access
+    superseded = checkpoints.save_checkpoint(8, FakeModel(b"1"), 1)
+    latest = checkpoints.save_checkpoint(8, FakeModel(b"2"), 2)
+    release.set()
+    latest.result()
+    assert superseded.cancelled()
+    assert minio_client.objects == {"checkpoints/8/0000000002.h5": b"2"}
+
+
+def test_checkpoints_are_removed_with_the_results(minio_client, monkeypatch):
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        minio_bucket="test",
+        scoach_result_reporting=constants.RESULT_REPORTING_MANIFEST.value,
+    ))
+    minio_client.objects["checkpoints/90/0000000001.h5"] = b"other run"
+    for step in (1, 2):
+        checkpoints.save_checkpoint(9, FakeModel(b"weights"), step)
+    utils.save_run(9, FakeModel(b"weights"), 0.5, 0.25)
+    assert sorted(minio_client.objects) == [
+        "checkpoints/90/0000000001.h5", "results/9.json", "weights/9.h5"]
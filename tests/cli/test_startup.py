@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Only the commands that need them may import these
+HEAVY_MODULES = [
+    "dask",
+    "dask_jobqueue",
+    "distributed",
+    "django.db.models",
+    "jinja2",
+    "minio",
+    "prefect",
+    "psycopg2",
+    "tensorflow",
+    "urllib3",
+]
+# Generous, cold starts used to take seconds
+STARTUP_BUDGET = 1.5
+
+
+def test_cli_import_is_light():
+    output = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, json; import scoach.cli; "
+         f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stdout
+    assert json.loads(output) == []
+
+
+@pytest.mark.parametrize("argv", [["version"], ["--help"], ["run", "--help"]])
+def test_cli_cold_start(argv):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c",
+         "from scoach.cli import app; app(prog_name='scoach')", *argv],
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    assert time.perf_counter() - start < STARTUP_BUDGET
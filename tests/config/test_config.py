@@ -0,0 +1,73 @@
+import os
+
+import pytest
+import yaml
+
+from scoach import config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    monkeypatch.setattr(config, "_config_path", lambda: path)
+    monkeypatch.setattr(config, "_cached", None)
+    monkeypatch.setattr(config, "_pinned", None)
+    environ = dict(os.environ)
+    for key in config.Config.keys():
+        os.environ.pop(key, None)
+    yield path
+    os.environ.clear()
+    os.environ.update(environ)
+
+
+def _write(path, values, mtime):
+    path.write_text(yaml.dump(values))
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_settings_are_typed(config_file, monkeypatch):
+    monkeypatch.setenv("SLURM_JOB_EXCLUSIVE", "yes")
+    monkeypatch.setenv("MINIO_BUCKET", "from-env")
+    _write(config_file, {"DB_PORT": "5433", "MINIO_BUCKET": "from-file"}, 1)
+    settings = config.get_config()
+    assert settings.db_port == 5433
+    assert settings.slurm_job_exclusive is True
+    # The config file takes precedence
+    assert settings.minio_bucket == "from-file"
+    assert settings.minio_part_size == config.Config().minio_part_size
+    with pytest.raises(AttributeError):
+        settings.db_port = 1
+
+
+def test_config_file_is_parsed_once(config_file, monkeypatch):
+    _write(config_file, {"MINIO_BUCKET": "first"}, 1)
+    parses = []
+    safe_load = yaml.safe_load
+    monkeypatch.setattr(
+        yaml, "safe_load", lambda f: parses.append(1) or safe_load(f))
+    assert config.get_config() is config.get_config()
+    assert config.get_config().minio_bucket == "first"
+    assert len(parses) == 1
+    # Changes are picked up by mtime
+    _write(config_file, {"MINIO_BUCKET": "second"}, 2)
+    assert config.get_config().minio_bucket == "second"
+    assert len(parses) == 2
+
+
+def test_pinned_settings(config_file):
+    _write(config_file, {"MINIO_BUCKET": "local"}, 1)
+    config.use_config(config.Config(minio_bucket="daemon"))
+    assert config.is_config_pinned()
+    assert config.get_config().minio_bucket == "daemon"
+    assert os.environ["MINIO_BUCKET"] == "daemon"
+
+
+def test_workers_get_no_database_credentials(config_file, monkeypatch):
+    # e.g. inherited from the daemon through the job environment
+    monkeypatch.setenv("DB_PASSWORD", "secret")
+    daemon = config.Config(db_host="db", db_password="secret", minio_bucket="daemon")
+    config.use_config(daemon.without_database())
+    assert config.get_config().db_password is None
+    assert config.get_config().minio_bucket == "daemon"
+    assert "DB_PASSWORD" not in os.environ
+    assert "DB_HOST" not in os.environ
@@ -0,0 +1,192 @@
+import json
+
+import pytest
+
+
+class FakeObject:
+    def __init__(self, object_name):
+        self.object_name = object_name
+
+
+class FakeStat:
+    def __init__(self, size, etag=None):
+        self.size = size
+        self.etag = etag
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+    def stream(self, amt):
+        for i in range(0, len(self._data), amt):
+            yield self._data[i:i + amt]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    """
+    In-memory stand-in for a Minio client, keeping objects by path
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.buckets = set()
+        self.uploads = []
+        self.ranges = []
+        self.stats = 0
+
+    def put_object(self, bucket, path, data, length, **kwargs):
+        self.buckets.add(bucket)
+        self.objects[path] = data.read(length)
+
+    def fput_object(self, bucket, path, file_path, part_size=None, num_parallel_uploads=None, **kwargs):
+        self.buckets.add(bucket)
+        self.uploads.append((part_size, num_parallel_uploads))
+        with open(file_path, "rb") as f:
+            self.objects[path] = f.read()
+
+    def _get(self, path):
+        from minio.error import S3Error  # pylint: disable=import-outside-toplevel
+        if path not in self.objects:
+            raise S3Error(
+                code="NoSuchKey", message="", resource=path,
+                request_id=None, host_id=None, response=None)
+        return self.objects[path]
+
+    def stat_object(self, bucket, path):
+        self.stats += 1
+        data = self._get(path)
+        return FakeStat(len(data), etag=str(hash(data)))
+
+    def get_object(self, bucket, path, offset=0, length=None):
+        data = self._get(path)
+        if length is None:
+            return FakeResponse(data[offset:])
+        self.ranges.append((offset, length))
+        return FakeResponse(data[offset:offset + length])
+
+    def list_objects(self, bucket, prefix):
+        return [FakeObject(path) for path in sorted(self.objects) if path.startswith(prefix)]
+
+    def remove_object(self, bucket, path):
+        del self.objects[path]
+
+
+class FakeModel:
+    """
+    Stand-in for a Keras model whose weights are a byte string
+    """
+
+    def __init__(self, state=b""):
+        self.state = state
+
+    def save_weights(self, path):
+        with open(path, "wb") as f:
+            f.write(self.state)
+
+    def load_weights(self, path):
+        with open(path, "rb") as f:
+            self.state = f.read()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database(tmp_path_factory):
+    """
+    Runs the tests against a throwaway database, created from the models
+    and destroyed afterwards, so the configured one is never touched.
+    SQLite ones are kept in a temporary file shared by the daemon threads.
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.db import connection
+    import scoach.models  # noqa: F401 pylint: disable=unused-import
+    if connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = str(
+            tmp_path_factory.mktemp("database") / "scoach.sqlite3")
+    name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    yield connection.settings_dict["NAME"]
+    connection.creation.destroy_test_db(name, verbosity=0)
+
+
+@pytest.fixture
+def no_pending_runs(database):
+    """
+    Makes sure no runs but the ones of the test can be claimed
+    """
+    # pylint: disable=import-outside-toplevel
+    from scoach.constants import constants
+    from scoach.models import Run
+    from scoach.runs import get_status_id
+    pending = Run.objects.filter(status_id__in=[
+        get_status_id(constants.RUN_STATUS_CREATED.value),
+        get_status_id(constants.RUN_STATUS_QUEUED.value),
+    ])
+    assert not pending.exists(), "Runs left pending by another test"
+
+
+@pytest.fixture
+def minio_client(monkeypatch):
+    """
+    A FakeMinio returned by every `get_minio_client` of scoach
+    """
+    # pylint: disable=import-outside-toplevel
+    from scoach import checkpoints, results, utils
+    client = FakeMinio()
+    for module in (utils, checkpoints, results):
+        monkeypatch.setattr(module, "get_minio_client", lambda *args, **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def notify_socket(tmp_path, monkeypatch):
+    """
+    Moves the daemon notification socket out of the user's home, so a
+    running daemon is left alone
+    """
+    from scoach import notifier  # pylint: disable=import-outside-toplevel
+    path = tmp_path / "scoach.sock"
+    monkeypatch.setattr(notifier, "_socket_path", lambda: path)
+    return path
+
+
+@pytest.fixture
+def make_runs():
+    """
+    Factory of runs sharing a model, a script and parameters, all
+    removed after the test
+    """
+    # pylint: disable=import-outside-toplevel
+    from scoach import models
+    from scoach.constants import constants
+    from scoach.runs import get_status_id
+    created = []
+
+    def make(count: int, status: str = constants.RUN_STATUS_CREATED.value):
+        model = models.Model.objects.create(config=json.dumps({"test": "test"}))
+        script = models.Script.objects.create(path="tests/conftest.py")
+        parameters = models.Parameters.objects.create(config=json.dumps({"test": "test"}))
+        created.extend((model, script, parameters))
+        status_id = get_status_id(status)
+        return [
+            models.Run.objects.create(
+                model=model, script=script, parameters=parameters, status_id=status_id)
+            for _ in range(count)
+        ]
+
+    yield make
+    weights_ids = [
+        weights_id
+        for obj in created if isinstance(obj, models.Model)
+        for weights_id in obj.run_set.exclude(weights=None).values_list("weights_id", flat=True)
+    ]
+    for obj in created:
+        obj.delete()
+    models.Weights.objects.filter(id__in=weights_ids).delete()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+from scoach import config, models
+from scoach import scoach as daemon_module
+from scoach.constants import constants
+from scoach.db import db_session
+from scoach.notifier import notify_new_runs
+from scoach.runs import RunClaimLost, transition_run
+from scoach.scoach import Scoach
+
+# The daemon executes every pending run
+pytestmark = pytest.mark.usefixtures("no_pending_runs")
+
+
+@db_session
+def _start(run_id) -> bool:
+    return transition_run(
+        run_id,
+        constants.RUN_STATUS_RUNNING.value,
+        from_statuses=[constants.RUN_STATUS_QUEUED.value],
+    )
+
+
+class FakeExecutor:
+    """
+    Starts runs like Executor does, then pretends to train them
+    """
+
+    def __init__(self, crashing=(), lost=()):
+        self.executed = []
+        self.running = 0
+        self.max_running = 0
+        self.crashing = set(crashing)
+        self.lost = set(lost)
+
+    async def start(self):
+        pass
+
+    async def execute(self, run_id):
+        loop = asyncio.get_running_loop()
+        if run_id in self.lost:
+            # Another daemon claimed the run again and started it first
+            await loop.run_in_executor(None, _start, run_id)
+        if not await loop.run_in_executor(None, _start, run_id):
+            raise RunClaimLost(f"Run #{run_id} is no longer queued")
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.05)
+            if run_id in self.crashing:
+                raise RuntimeError("Worker lost")
+            self.executed.append(run_id)
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def daemon(notify_socket, monkeypatch):
+    monkeypatch.setattr(config, "_pinned", config.Config(scoach_max_inflight_runs=2))
+    return Scoach(local=True)
+
+
+def _supervise(daemon: Scoach, until, while_running=None, timeout: float = 5):
+    """
+    Runs the supervisor until a condition holds
+    """
+    async def main():
+        supervisor = asyncio.ensure_future(daemon._supervise())  # pylint: disable=protected-access
+        deadline = time.monotonic() + timeout
+        try:
+            if while_running is not None:
+                await asyncio.sleep(0.1)
+                await asyncio.get_running_loop().run_in_executor(None, while_running)
+            while not until():
+                if supervisor.done():
+                    supervisor.result()
+                assert time.monotonic() < deadline, "Timed out"
+                await asyncio.sleep(0.01)
+        finally:
+            supervisor.cancel()
+            for task in [*daemon._tasks]:  # pylint: disable=protected-access
+                task.cancel()
+            # Lets the listener thread return
+            daemon._listener.wakeup()  # pylint: disable=protected-access
+    try:
+        asyncio.run(main())
+    finally:
+        daemon._listener.close()  # pylint: disable=protected-access
+
+
+def _status(run) -> str:
+    return models.Run.objects.select_related("status").get(id=run.id).status.status
+
+
+def test_runs_are_dispatched_within_bounds(daemon, make_runs):
+    runs = make_runs(5)
+    executor = daemon._executor = FakeExecutor()  # pylint: disable=protected-access
+    _supervise(daemon, lambda: len(executor.executed) == 5)
+    assert sorted(executor.executed) == [run.id for run in runs]
+    assert executor.max_running == 2
+
+
+def test_new_runs_wake_up_the_supervisor(daemon, make_runs):
+    executor = daemon._executor = FakeExecutor()  # pylint: disable=protected-access
+    submitted = []
+
+    def submit():
+        submitted.extend(make_runs(1))
+        notify_new_runs()
+
+    # Far sooner than the fallback poll
+    _supervise(daemon, lambda: len(executor.executed) == 1, while_running=submit, timeout=2)
+    assert executor.executed == [submitted[0].id]
+
+
+def test_runs_that_cannot_execute_fail(daemon, make_runs):
+    runs = make_runs(2)
+    executor = daemon._executor = FakeExecutor(crashing=[runs[0].id])  # pylint: disable=protected-access
+    # Every slot is free once the failure is stored
+    _supervise(daemon, lambda: executor.executed == [runs[1].id] and daemon._queue.claimable == 2)  # pylint: disable=protected-access
+    assert _status(runs[0]) == constants.RUN_STATUS_FAILED.value
+
+
+def test_runs_whose_claim_was_lost_are_left_alone(daemon, make_runs):
+    runs = make_runs(2)
+    executor = daemon._executor = FakeExecutor(lost=[runs[0].id])  # pylint: disable=protected-access
+    _supervise(daemon, lambda: executor.executed == [runs[1].id] and daemon._queue.claimable == 2)  # pylint: disable=protected-access
+    # Still running for the daemon that claimed it again
+    assert _status(runs[0]) == constants.RUN_STATUS_RUNNING.value
+
+
+def test_results_are_kept_until_applied(daemon, monkeypatch):
+    applied = []
+
+    def apply(run_ids):
+        if not applied:
+            applied.append(None)
+            raise ConnectionError("Database unavailable")
+        applied.append(run_ids)
+
+    monkeypatch.setattr(daemon_module, "apply_result_manifests", apply)
+    daemon._finished.update({1, 2})  # pylint: disable=protected-access
+    with pytest.raises(ConnectionError):
+        asyncio.run(daemon._apply_results())  # pylint: disable=protected-access
+    assert daemon._finished == {1, 2}  # pylint: disable=protected-access
+    asyncio.run(daemon._apply_results())  # pylint: disable=protected-access
+    assert applied[-1] == [1, 2]
+    assert daemon._finished == set()  # pylint: disable=protected-access
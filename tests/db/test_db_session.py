@@ -0,0 +1,60 @@
+from django.db import connections
+
+from scoach import config, db, utils
+from scoach.constants import constants
+from scoach.db import db_session
+from scoach.models import Status
+
+from tests.conftest import FakeModel
+
+connection = connections["default"]
+
+
+@db_session
+def _query():
+    return Status.objects.count()
+
+
+def test_connections_are_closed_by_default(monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, "CONN_MAX_AGE", 0)
+    connection.close()
+    _query()
+    assert connection.connection is None
+
+
+def test_persistent_connections_are_reused(monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, "CONN_MAX_AGE", 60)
+    connection.close()
+    _query()
+    persistent = connection.connection
+    assert persistent is not None
+    _query()
+    assert connection.connection is persistent
+    connection.close()
+
+
+def test_unhealthy_connections_are_replaced(monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, "CONN_MAX_AGE", 60)
+    monkeypatch.setattr(config, "_pinned", config.Config(db_conn_health_checks=True))
+    connection.close()
+    _query()
+    broken = connection.connection
+    monkeypatch.setattr(type(connection), "is_usable", lambda self: False)
+    _query()
+    assert connection.connection is not broken
+    connection.close()
+
+
+def test_save_run_uses_a_single_session(monkeypatch, minio_client, make_runs):
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        minio_bucket="test",
+        scoach_result_reporting=constants.RESULT_REPORTING_DATABASE.value,
+    ))
+    sessions = []
+    monkeypatch.setattr(db, "check_connections", lambda: sessions.append(1))
+    run = make_runs(1, constants.RUN_STATUS_RUNNING.value)[0]
+    utils.save_run(run.id, FakeModel(b"weights"), 0.5, 0.25)
+    assert len(sessions) == 1
+    run.refresh_from_db()
+    assert run.validation_score == 0.25
+    assert minio_client.objects[run.weights.path] == b"weights"
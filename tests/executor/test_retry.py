@@ -0,0 +1,57 @@
+import pytest
+
+from scoach import config, models
+from scoach.cli import run as run_cli
+from scoach.constants import constants
+from scoach.runs import transition_run
+
+pytest.importorskip("prefect")
+pytest.importorskip("dask_jobqueue")
+from scoach import executor  # noqa: E402  pylint: disable=wrong-import-position
+
+
+@pytest.fixture
+def run(make_runs, minio_client, monkeypatch):
+    monkeypatch.setattr(executor, "get_minio_client", lambda: minio_client)
+    monkeypatch.setattr(run_cli, "check_config", lambda: True)
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        minio_bucket="test", scoach_warm_pool=False))
+    queued = make_runs(1, constants.RUN_STATUS_QUEUED.value)[0]
+    minio_client.objects[queued.script.path] = (
+        b"print('epoch', {{checkpoint_step}})\n"
+        b"raise RuntimeError('out of memory')\n"
+    )
+    return queued
+
+
+def _status(run) -> str:
+    return models.Run.objects.select_related("status").get(id=run.id).status.status
+
+
+def test_crashed_runs_are_retried_from_their_checkpoint(run, minio_client, monkeypatch):
+    lookups = []
+    latest_checkpoint = executor.latest_checkpoint
+    monkeypatch.setattr(executor, "latest_checkpoint", lambda run_id: lookups.append(
+        run_id) or latest_checkpoint(run_id))
+    template_text, variables = executor.prepare_run(run.id)
+    assert variables["checkpoint_step"] is None
+    # Fresh runs have no checkpoints to look up
+    assert lookups == []
+    assert _status(run) == constants.RUN_STATUS_RUNNING.value
+    state = executor.run_training_flow(run.id, template_text, variables)
+    assert state.is_failed()
+    executor.Executor._store_final_status(run.id, state)  # pylint: disable=protected-access
+    assert _status(run) == constants.RUN_STATUS_FAILED.value
+    # The script checkpointed before crashing
+    minio_client.objects[f"checkpoints/{run.id}/0000000004.h5"] = b"weights"
+    run_cli.retry(str(run.id))
+    assert _status(run) == constants.RUN_STATUS_CREATED.value
+    # Claimed by the daemon again
+    assert transition_run(
+        run.id,
+        constants.RUN_STATUS_QUEUED.value,
+        from_statuses=[constants.RUN_STATUS_CREATED.value],
+    )
+    _, variables = executor.prepare_run(run.id)
+    assert variables["checkpoint_step"] == 4
+    assert lookups == [run.id]
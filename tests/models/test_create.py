@@ -254,3 +254,6 @@ def test_run():
     assert run.validation_score == 0.6
     run.delete()
     assert run.id is None
+    # Statuses and tags have unique names, so nothing may be left behind
+    for obj in (tag, status, weights, parameters, script, model):
+        obj.delete()
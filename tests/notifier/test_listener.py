@@ -0,0 +1,27 @@
+from scoach import models  # pylint: disable=unused-import
+from scoach.notifier import RunListener, notify_new_runs
+
+
+def test_notify_wakes_up_listener(notify_socket):
+    listener = RunListener()
+    try:
+        # Nothing announced yet, so we time out
+        assert listener.wait(0) is False
+        notify_new_runs()
+        notify_new_runs()
+        assert listener.wait(1) is True
+        # Both notifications were coalesced into a single wake up
+        assert listener.wait(0) is False
+    finally:
+        listener.close()
+    assert not notify_socket.exists()
+
+
+def test_wakeup(notify_socket):
+    listener = RunListener()
+    try:
+        listener.wakeup()
+        assert listener.wait(1) is True
+        assert listener.wait(0) is False
+    finally:
+        listener.close()
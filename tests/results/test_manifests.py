@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from scoach import config, results, utils
+from scoach.constants import constants
+
+from tests.conftest import FakeModel
+
+
+@pytest.fixture(autouse=True)
+def manifest_reporting(monkeypatch):
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        minio_bucket="test",
+        scoach_result_reporting=constants.RESULT_REPORTING_MANIFEST.value,
+    ))
+
+
+@pytest.fixture
+def runs(make_runs):
+    return make_runs(3, constants.RUN_STATUS_RUNNING.value)
+
+
+def test_save_run_writes_a_manifest(minio_client):
+    utils.save_run(1234, FakeModel(b"weights"), 0.5, "0.25")
+    assert minio_client.objects["weights/1234.h5"] == b"weights"
+    assert json.loads(minio_client.objects["results/1234.json"]) == {
+        "run_id": 1234,
+        "train_score": 0.5,
+        "validation_score": 0.25,
+        "weights_path": "weights/1234.h5",
+        "codec": "h5",
+    }
+
+
+def test_apply_result_manifests(minio_client, runs):
+    for i, run in enumerate(runs):
+        results.write_result_manifest(
+            minio_client, run.id, i, i / 10, f"weights/{run.id}.h5", "h5")
+    applied = results.apply_result_manifests([run.id for run in runs[:2]])
+    assert applied == [run.id for run in runs[:2]]
+    for i, run in enumerate(runs[:2]):
+        run.refresh_from_db()
+        assert run.train_score == i
+        assert run.validation_score == i / 10
+        assert run.weights.path == f"weights/{run.id}.h5"
+    assert [*minio_client.objects] == [f"results/{runs[2].id}.json"]
+    # Leftover manifests are found by listing
+    assert results.apply_result_manifests() == [runs[2].id]
+    assert not minio_client.objects
+
+
+def test_apply_result_manifests_skips_missing(minio_client, runs):
+    results.write_result_manifest(minio_client, 0, 1.0, 1.0, "weights/0.h5", "h5")
+    results.write_result_manifest(
+        minio_client, runs[0].id, 1.0, 1.0, f"weights/{runs[0].id}.h5", "h5")
+    assert results.apply_result_manifests([0, runs[0].id, runs[1].id]) == [runs[0].id]
+    assert not minio_client.objects
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from scoach import models
+from scoach.constants import constants
+from scoach.runs import claim_runs, requeue_stale_runs
+
+# Claims hand out every pending run
+pytestmark = pytest.mark.usefixtures("no_pending_runs")
+
+
+def test_claim_runs(make_runs):
+    runs = make_runs(3)
+    claimed = claim_runs(2)
+    assert claimed == [(run.id, 0) for run in runs[:2]]
+    for run in runs[:2]:
+        run.refresh_from_db()
+        assert run.status.status == constants.RUN_STATUS_QUEUED.value
+    # Claimed runs are never handed out again
+    assert claim_runs(10) == [(runs[2].id, 0)]
+    assert claim_runs(10) == []
+
+
+def test_claim_runs_by_priority(make_runs):
+    runs = make_runs(3)
+    runs[2].priority = 10
+    runs[2].save()
+    assert claim_runs(1) == [(runs[2].id, 10)]
+    assert claim_runs(10) == [(runs[0].id, 0), (runs[1].id, 0)]
+
+
+def test_stale_queued_runs_are_requeued(make_runs):
+    runs = make_runs(2, constants.RUN_STATUS_QUEUED.value)
+    # The first run was claimed by a daemon that stopped long ago
+    models.Run.objects.filter(id=runs[0].id).update(
+        date_modified=timezone.now() - timedelta(
+            seconds=constants.SCHEDULER_QUEUED_LEASE.value + 1))
+    assert requeue_stale_runs() == 1
+    assert claim_runs(10) == [(runs[0].id, 0)]
+    # Recently claimed runs are left to their daemon
+    runs[1].refresh_from_db()
+    assert runs[1].status.status == constants.RUN_STATUS_QUEUED.value
@@ -0,0 +1,32 @@
+from scoach.runs import DispatchQueue
+
+
+def test_dispatch_queue_bounds():
+    queue = DispatchQueue(max_inflight=2)
+    # Runs are only claimed for free slots
+    assert queue.claimable == 2
+    for run_id in range(1, 5):
+        queue.push(run_id)
+    assert queue.claimable == -2
+    # Only as many runs as there are slots are dispatched
+    assert queue.pop_ready() == [1, 2]
+    assert queue.pop_ready() == []
+    queue.done(1)
+    assert queue.claimable == -1
+    assert queue.pop_ready() == [3]
+    queue.done(2)
+    queue.done(3)
+    assert queue.pop_ready() == [4]
+    assert queue.claimable == 1
+
+
+def test_dispatch_queue_priority():
+    queue = DispatchQueue(max_inflight=1)
+    queue.push(1, priority=0)
+    queue.push(2, priority=5)
+    queue.push(3, priority=5)
+    assert queue.pop_ready() == [2]
+    queue.done(2)
+    assert queue.pop_ready() == [3]
+    queue.done(3)
+    assert queue.pop_ready() == [1]
@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from scoach import models
+from scoach.constants import constants
+from scoach.runs import filter_runs, get_status_id
+from scoach.utils import iter_keyset
+
+
+def test_filter_runs(make_runs):
+    runs = make_runs(4)
+    tag = models.Tag.objects.create(name="test_filter_runs")
+    try:
+        for run in runs[:2]:
+            run.tags.add(tag)
+        runs[1].validation_score = 0.9
+        runs[1].save()
+        runs[3].status_id = get_status_id(constants.RUN_STATUS_FAILED.value)
+        runs[3].save()
+        ids = [run.id for run in runs]
+        tagged = filter_runs(tags=["test_filter_runs"]).filter(id__in=ids)
+        assert [run.id for run in tagged.order_by("id")] == ids[:2]
+        scored = filter_runs(tags=["test_filter_runs"], min_score=0.5)
+        assert [run.id for run in scored] == [runs[1].id]
+        failed = filter_runs(status=constants.RUN_STATUS_FAILED.value).filter(id__in=ids)
+        assert failed.count() == 1
+    finally:
+        tag.delete()
+
+
+def test_iter_keyset_pages(make_runs):
+    ids = [run.id for run in make_runs(7)]
+    queryset = filter_runs().filter(id__in=ids)
+    assert [run.id for run in iter_keyset(queryset, chunk_size=3)] == ids
+    assert [run.id for run in iter_keyset(
+        queryset, chunk_size=3, offset=2, limit=4)] == ids[2:6]
+    assert [run.id for run in iter_keyset(
+        queryset, chunk_size=3, after_id=ids[4])] == ids[5:]
+    assert [*iter_keyset(queryset, offset=7)] == []
+
+
+def test_listing_runs_has_no_query_per_run(make_runs):
+    runs = make_runs(9)
+    queryset = filter_runs().filter(id__in=[run.id for run in runs])
+    with CaptureQueriesContext(connection) as queries:
+        lines = [str(run) for run in iter_keyset(queryset, chunk_size=5)]
+    assert len(lines) == 9
+    # Runs and their tags, for each of the two chunks
+    assert len(queries) == 4
@@ -0,0 +1,48 @@
+import pytest
+
+from scoach import models, utils
+from scoach.constants import constants
+from scoach.runs import get_status_id, transition_run
+
+
+def test_get_status_id():
+    status_id = get_status_id(constants.RUN_STATUS_RUNNING.value)
+    assert models.Status.objects.get(
+        status=constants.RUN_STATUS_RUNNING.value).id == status_id
+    assert get_status_id(constants.RUN_STATUS_RUNNING.value) == status_id
+
+
+def test_transition_run(make_runs):
+    run = make_runs(1)[0]
+    assert transition_run(
+        run.id,
+        constants.RUN_STATUS_QUEUED.value,
+        from_statuses=[constants.RUN_STATUS_CREATED.value],
+    )
+    run.refresh_from_db()
+    assert run.status.status == constants.RUN_STATUS_QUEUED.value
+    # The run is no longer created, so it's left untouched
+    assert not transition_run(
+        run.id,
+        constants.RUN_STATUS_FAILED.value,
+        from_statuses=[constants.RUN_STATUS_CREATED.value],
+    )
+    run.refresh_from_db()
+    assert run.status.status == constants.RUN_STATUS_QUEUED.value
+    assert transition_run(run.id, constants.RUN_STATUS_CANCELED.value)
+    assert not transition_run(-1, constants.RUN_STATUS_CANCELED.value)
+
+
+def test_storing_results_keeps_the_status(make_runs):
+    run = make_runs(1, constants.RUN_STATUS_RUNNING.value)[0]
+    # Canceled while its weights were uploaded
+    assert transition_run(run.id, constants.RUN_STATUS_CANCELED.value)
+    utils._store_run_results(run.id, 0.5, 0.25, "weights/test.h5", "h5")  # pylint: disable=protected-access
+    run.refresh_from_db()
+    assert run.status.status == constants.RUN_STATUS_CANCELED.value
+    assert (run.train_score, run.validation_score) == (0.5, 0.25)
+    assert run.weights.path == "weights/test.h5"
+    weights = models.Weights.objects.count()
+    with pytest.raises(ValueError):
+        utils._store_run_results(-1, 0.5, 0.25, "weights/test.h5", "h5")  # pylint: disable=protected-access
+    assert models.Weights.objects.count() == weights
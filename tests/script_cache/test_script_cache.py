@@ -0,0 +1,52 @@
+from scoach.scripts import ScriptCache, compile_template
+
+
+def test_scripts_are_downloaded_once(minio_client):
+    minio_client.objects["scripts/a.py"] = b"print('a')"
+    cache = ScriptCache()
+    for _ in range(3):
+        assert cache.get(minio_client, "bucket", "scripts/a.py", revalidate=False) == "print('a')"
+    # Content-addressed scripts are never checked again
+    assert minio_client.stats == 0
+    minio_client.objects["scripts/a.py"] = b"print('changed')"
+    assert cache.get(minio_client, "bucket", "scripts/a.py", revalidate=False) == "print('a')"
+
+
+def test_legacy_scripts_are_revalidated(minio_client):
+    minio_client.objects["scripts/legacy.py"] = b"v1"
+    cache = ScriptCache(revalidate_after=0)
+    assert cache.get(minio_client, "bucket", "scripts/legacy.py") == "v1"
+    assert cache.get(minio_client, "bucket", "scripts/legacy.py") == "v1"
+    minio_client.objects["scripts/legacy.py"] = b"v2"
+    assert cache.get(minio_client, "bucket", "scripts/legacy.py") == "v2"
+    assert minio_client.stats == 3
+
+
+def test_revalidation_is_throttled(minio_client):
+    minio_client.objects["scripts/legacy.py"] = b"v1"
+    cache = ScriptCache(revalidate_after=60)
+    for _ in range(5):
+        assert cache.get(minio_client, "bucket", "scripts/legacy.py") == "v1"
+    assert minio_client.stats == 1
+
+
+def test_least_recently_used_scripts_are_evicted(minio_client):
+    for name in "abc":
+        minio_client.objects[f"scripts/{name}.py"] = name.encode()
+    cache = ScriptCache(max_size=2)
+    cache.get(minio_client, "bucket", "scripts/a.py", revalidate=False)
+    cache.get(minio_client, "bucket", "scripts/b.py", revalidate=False)
+    cache.get(minio_client, "bucket", "scripts/a.py", revalidate=False)
+    cache.get(minio_client, "bucket", "scripts/c.py", revalidate=False)
+    for name in "abc":
+        minio_client.objects[f"scripts/{name}.py"] = b"new"
+    assert cache.get(minio_client, "bucket", "scripts/a.py", revalidate=False) == "a"
+    assert cache.get(minio_client, "bucket", "scripts/c.py", revalidate=False) == "c"
+    # b was the least recently used
+    assert cache.get(minio_client, "bucket", "scripts/b.py", revalidate=False) == "new"
+
+
+def test_templates_are_compiled_once():
+    template = compile_template("lr = {{lr}}")
+    assert compile_template("lr = {{lr}}") is template
+    assert template.render(lr=0.1) == "lr = 0.1"
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from django.db.models import QuerySet
+from typer.testing import CliRunner
+
+from scoach import models
+from scoach.cli import run as run_cli
+from scoach.sweep import create_runs, grid_configs, random_configs
+from scoach.utils import config_digest
+
+
+def test_grid_configs():
+    configs = grid_configs(
+        {"epochs": 10, "lr": 0.1},
+        {"lr": [0.1, 0.01], "batch_size": [32, 64, 128]},
+    )
+    assert len(configs) == 6
+    assert {"epochs": 10, "lr": 0.01, "batch_size": 128} in configs
+    assert all(config["epochs"] == 10 for config in configs)
+    with pytest.raises(ValueError):
+        grid_configs({}, {"lr": []})
+
+
+def test_random_configs():
+    axes = {
+        "lr": {"distribution": "loguniform", "low": 1e-4, "high": 1e-1},
+        "units": {"distribution": "randint", "low": 8, "high": 64},
+        "activation": ["relu", "tanh"],
+    }
+    configs = random_configs({"epochs": 10}, axes, samples=20, seed=42)
+    assert len(configs) == 20
+    for config in configs:
+        assert config["epochs"] == 10
+        assert 1e-4 <= config["lr"] <= 1e-1
+        assert 8 <= config["units"] <= 64
+        assert config["activation"] in ("relu", "tanh")
+    # Seeded sweeps are reproducible
+    assert random_configs({"epochs": 10}, axes, samples=20, seed=42) == configs
+
+
+def test_create_runs():
+    script = models.Script.objects.create(path="tests/sweep/test_sweep.py")
+    configs = grid_configs({"test": "test"}, {"lr": [0.1, 0.01, 0.1]})
+    runs = create_runs(script, {"test": "test"}, configs, tags=["sweep"])
+    try:
+        assert len(runs) == 3
+        # Identical configs share their parameters
+        assert runs[0].parameters_id == runs[2].parameters_id
+        assert runs[0].parameters_id != runs[1].parameters_id
+        for run in runs:
+            run.refresh_from_db()
+            assert json.loads(run.parameters.config)["test"] == "test"
+            assert [tag.name for tag in run.tags.all()] == ["sweep"]
+    finally:
+        models.Model.objects.filter(id=runs[0].model_id).delete()
+        models.Parameters.objects.filter(
+            id__in=[run.parameters_id for run in runs]).delete()
+        models.Tag.objects.filter(name="sweep").delete()
+        script.delete()
+
+
+def test_create_runs_racing_another_sweep(monkeypatch):
+    script = models.Script.objects.create(path="tests/sweep/test_sweep.py")
+    configs = grid_configs({"test": "race"}, {"lr": [0.1, 0.01]})
+    bulk_create = QuerySet.bulk_create
+
+    def racing_bulk_create(self, objs, *args, **kwargs):
+        if self.model is models.Parameters:
+            # Another sweep inserts the same config first
+            models.Parameters.objects.create(
+                config=json.dumps(configs[0]), digest=config_digest(configs[0]))
+        return bulk_create(self, objs, *args, **kwargs)
+
+    monkeypatch.setattr(QuerySet, "bulk_create", racing_bulk_create)
+    runs = create_runs(script, {"test": "race"}, configs)
+    try:
+        assert len({run.parameters_id for run in runs}) == 2
+        assert runs[0].parameters.digest == config_digest(configs[0])
+    finally:
+        models.Model.objects.filter(id=runs[0].model_id).delete()
+        models.Parameters.objects.filter(
+            id__in=[run.parameters_id for run in runs]).delete()
+        script.delete()
+
+
+def test_sweep_without_configs(tmp_path, monkeypatch, minio_client):
+    monkeypatch.setattr(run_cli, "check_config", lambda: True)
+    paths = {}
+    for name, content in (("train.py", "print('train')"), ("job.json", "{}"),
+                          ("model.json", "{}"), ("axes.json", '{"lr": [0.1]}')):
+        paths[name] = tmp_path / name
+        paths[name].write_text(content)
+    result = CliRunner().invoke(run_cli.app, [
+        "sweep", str(paths["train.py"]), str(paths["job.json"]), str(paths["model.json"]),
+        "--random", str(paths["axes.json"]), "--samples", "0",
+    ])
+    assert result.exit_code == 0
+    assert "no runs were submitted" in result.output
+    # Nothing was uploaded for it
+    assert minio_client.objects == {}
+    assert not models.Script.objects.filter(path__endswith="/train.py").exists()
@@ -0,0 +1,66 @@
+import pytest
+from django.db import IntegrityError, connection, transaction
+
+from scoach import models, utils
+from scoach.constants import constants
+from scoach.runs import get_status_id
+
+
+@pytest.fixture
+def legacy_names(database):
+    # Older versions allowed several tags and statuses with the same name.
+    # The constraints are only dropped on the throwaway test database.
+    assert connection.settings_dict["NAME"] == database
+    altered = []
+    try:
+        for model, field_name in ((models.Tag, "name"), (models.Status, "status")):
+            field = model._meta.get_field(field_name)
+            legacy_field = field.clone()
+            legacy_field._unique = False
+            legacy_field.set_attributes_from_name(field_name)
+            legacy_field.model = model
+            with connection.schema_editor() as editor:
+                editor.alter_field(model, field, legacy_field)
+            altered.append((model, field, legacy_field))
+        yield
+    finally:
+        models.Tag.objects.filter(name="dedupe").delete()
+        # Duplicates left by a failed test would break the constraints
+        utils.dedupe_names()
+        for model, field, legacy_field in altered:
+            with connection.schema_editor() as editor:
+                editor.alter_field(model, legacy_field, field)
+
+
+def test_names_are_unique():
+    tag = models.Tag.objects.create(name="unique")
+    try:
+        with pytest.raises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(name="unique")
+    finally:
+        tag.delete()
+    get_status_id(constants.RUN_STATUS_CREATED.value)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        models.Status.objects.create(status=constants.RUN_STATUS_CREATED.value)
+
+
+def test_dedupe_names(legacy_names, make_runs):
+    created = get_status_id(constants.RUN_STATUS_CREATED.value)
+    duplicate_status = models.Status.objects.create(status=constants.RUN_STATUS_CREATED.value)
+    tags = [models.Tag.objects.create(name="dedupe") for _ in range(3)]
+    runs = make_runs(2)
+    runs[1].status = duplicate_status
+    runs[1].save()
+    runs[0].tags.add(tags[0], tags[1])
+    runs[1].tags.add(tags[1], tags[2])
+    utils.dedupe_names()
+    assert models.Status.objects.filter(status=constants.RUN_STATUS_CREATED.value).count() == 1
+    assert [*models.Tag.objects.filter(name="dedupe")] == [tags[0]]
+    for run in runs:
+        run.refresh_from_db()
+        assert run.status_id == created
+        assert [*run.tags.all()] == [tags[0]]
+
+
+# Runs last, to check the constraints are back
+test_names_are_still_unique = test_names_are_unique
@@ -0,0 +1,56 @@
+import hashlib
+import json
+
+from scoach import models
+from scoach.utils import (
+    backfill_config_digests,
+    canonical_json,
+    config_digest,
+    file_digest,
+    get_or_create_config,
+)
+
+
+def test_file_digest(tmp_path):
+    script = tmp_path / "train.py"
+    script.write_text("print('hello')\n")
+    assert file_digest(str(script)) == hashlib.sha256(
+        b"print('hello')\n").hexdigest()
+    # Same contents under another name have the same digest
+    copy = tmp_path / "copy.py"
+    copy.write_text("print('hello')\n")
+    assert file_digest(str(copy)) == file_digest(str(script))
+
+
+def test_config_digest_ignores_key_order():
+    assert canonical_json({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+    assert config_digest({"a": 1, "b": {"c": 2, "d": 3}}) == config_digest(
+        {"b": {"d": 3, "c": 2}, "a": 1})
+    assert config_digest({"a": 1}) != config_digest({"a": 2})
+
+
+def test_get_or_create_config():
+    parameters = get_or_create_config(models.Parameters, {"x": 1, "y": 2})
+    try:
+        assert parameters.digest == config_digest({"x": 1, "y": 2})
+        assert get_or_create_config(
+            models.Parameters, {"y": 2, "x": 1}).id == parameters.id
+    finally:
+        parameters.delete()
+
+
+def test_backfill_config_digests():
+    legacy = [
+        models.Model.objects.create(config=json.dumps({"x": 1, "y": 2})),
+        models.Model.objects.create(config=json.dumps({"y": 2, "x": 1})),
+    ]
+    try:
+        backfill_config_digests()
+        for model in legacy:
+            model.refresh_from_db()
+        # The duplicate keeps an empty digest so the index stays unique
+        assert legacy[0].digest == config_digest({"x": 1, "y": 2})
+        assert legacy[1].digest is None
+    finally:
+        for model in legacy:
+            model.delete()
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from django.db import connections, transaction
+
+from scoach import cache, models, utils
+from scoach.constants import constants
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch, make_runs):
+    monkeypatch.setattr(cache, "weights_cache", cache.WeightsCache(tmp_path))
+    downloads = []
+
+    def download(minio_client, file_path, file_name):
+        downloads.append(file_path)
+        with open(file_name, "w") as f:
+            f.write(file_path)
+
+    # The model is just the weights, and it must be built by the caller
+    def build_model(run, weights_file):
+        assert threading.current_thread() is threading.main_thread()
+        with open(weights_file) as f:
+            return f.read()
+
+    monkeypatch.setattr(utils, "download_from_minio", download)
+    monkeypatch.setattr(utils, "_build_model", build_model)
+    created = make_runs(6, constants.RUN_STATUS_COMPLETED.value)
+    for i, run in enumerate(created):
+        run.weights = models.Weights.objects.create(path=f"weights/{i}.h5")
+        run.save()
+    return created, downloads
+
+
+def test_load_runs_by_ids(runs):
+    created, downloads = runs
+    run_ids = [run.id for run in reversed(created)]
+    loaded = utils.load_runs(run_ids)
+    assert [*loaded.keys()] == run_ids
+    assert loaded[created[0].id] == "weights/0.h5"
+    # Loading again only reads the local cache
+    utils.load_runs(run_ids)
+    assert sorted(downloads) == [f"weights/{i}.h5" for i in range(6)]
+
+
+def test_load_runs_lazily_from_a_queryset(runs):
+    created, _ = runs
+    loaded = utils.load_runs(
+        models.Run.objects.filter(id__in=[run.id for run in created]), lazy=True)
+    run, model = next(loaded)
+    assert model == run.weights.path
+    loaded.close()
+    assert len([*utils.load_runs(
+        models.Run.objects.filter(id__in=[run.id for run in created]), lazy=True)]) == 6
+
+
+def test_load_runs_missing(runs):
+    created, _ = runs
+    with pytest.raises(ValueError):
+        utils.load_runs([created[0].id, 0])
+
+
+def test_load_runs_keeps_the_callers_transaction(runs, monkeypatch):
+    created, _ = runs
+    connection = connections["default"]
+    monkeypatch.setitem(connection.settings_dict, "CONN_MAX_AGE", 0)
+    with transaction.atomic():
+        models.Run.objects.count()
+        opened = connection.connection
+        utils.load_runs([run.id for run in created])
+        utils.load_run(created[0].id)
+        assert connection.connection is opened
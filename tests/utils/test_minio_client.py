@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from scoach import config
+from scoach.constants import constants
+from scoach.utils import _minio_pool_size, get_minio_client
+
+
+def test_clients_are_shared():
+    first = get_minio_client("key", "secret", "localhost:9000", "bucket")
+    assert get_minio_client("key", "secret", "localhost:9000", "other") is first
+    with ThreadPoolExecutor(8) as pool:
+        clients = pool.map(
+            lambda _: get_minio_client("key", "secret", "localhost:9000", "bucket"),
+            range(32),
+        )
+    assert all(client is first for client in clients)
+
+
+def test_clients_are_keyed_by_credentials():
+    first = get_minio_client("key", "secret", "localhost:9000", "bucket")
+    second = get_minio_client("other", "secret", "localhost:9000", "bucket")
+    assert second is not first
+    # But they share their connections
+    assert second._http is first._http  # pylint: disable=protected-access
+
+
+def test_forked_children_get_new_clients():
+    first = get_minio_client("key", "secret", "localhost:9000", "bucket")
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        child = get_minio_client("key", "secret", "localhost:9000", "bucket")
+        os.write(write_fd, b"1" if child is not first else b"0")
+        os._exit(0)  # pylint: disable=protected-access
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_pool_fits_the_concurrency(monkeypatch):
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        db_pool_size=32, minio_transfer_concurrency=4))
+    # Every daemon thread reads a script while manifests are applied
+    assert _minio_pool_size() == 36
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        db_pool_size=2, minio_transfer_concurrency=8))
+    # Every run of load_runs downloads its parts in parallel
+    assert _minio_pool_size() == constants.LOAD_RUNS_CONCURRENCY.value * 8
@@ -0,0 +1,19 @@
+from scoach.utils import RunLogWriter
+
+
+def test_run_log_writer_rolls_parts(minio_client):
+    writer = RunLogWriter(minio_client, "bucket", 42, "stdout", part_size=8)
+    writer.write("abc\n")
+    assert minio_client.objects == {}
+    writer.write("defgh\nij\n")
+    # Full parts are uploaded as soon as they fill up
+    assert minio_client.objects == {
+        "logs/42/stdout.00000.log": b"abc\ndefg",
+    }
+    writer.flush()
+    writer.flush()
+    assert minio_client.objects == {
+        "logs/42/stdout.00000.log": b"abc\ndefg",
+        "logs/42/stdout.00001.log": b"h\nij\n",
+    }
+    assert minio_client.buckets == {"bucket"}
@@ -0,0 +1,29 @@
+import os
+
+from scoach import config
+from scoach.utils import download_from_minio, save_to_minio
+
+
+def test_transfers_use_parallel_parts(tmp_path, monkeypatch, minio_client):
+    monkeypatch.setattr(config, "_pinned", config.Config(
+        minio_bucket="bucket", minio_part_size=1000, minio_transfer_concurrency=3))
+    data = os.urandom(4500)
+    source = tmp_path / "source.h5"
+    source.write_bytes(data)
+    save_to_minio(minio_client, "weights/1.h5", str(source))
+    assert minio_client.uploads == [(1000, 3)]
+    assert minio_client.buckets == {"bucket"}
+    target = tmp_path / "target.h5"
+    download_from_minio(minio_client, "weights/1.h5", str(target))
+    assert target.read_bytes() == data
+    assert sorted(minio_client.ranges) == [
+        (0, 1000), (1000, 1000), (2000, 1000), (3000, 1000), (4000, 500),
+    ]
+
+
+def test_download_of_empty_object(tmp_path, monkeypatch, minio_client):
+    monkeypatch.setattr(config, "_pinned", config.Config(minio_bucket="bucket"))
+    minio_client.objects["empty"] = b""
+    target = tmp_path / "empty"
+    download_from_minio(minio_client, "empty", str(target))
+    assert target.read_bytes() == b""
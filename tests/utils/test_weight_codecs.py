@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from scoach.weight_codecs import (
+    from_bfloat16,
+    get_codec,
+    load_weights,
+    save_weights,
+    to_bfloat16,
+)
+
+
+class FakeModel:
+    def __init__(self, weights):
+        self.weights = weights
+
+    def get_weights(self):
+        return [w.copy() for w in self.weights]
+
+    def set_weights(self, weights):
+        assert [w.dtype for w in weights] == [w.dtype for w in self.weights]
+        self.weights = weights
+
+    def save_weights(self, path):
+        with open(path, "wb") as f:
+            np.save(f, self.weights[0])
+
+    def load_weights(self, path):
+        assert path.endswith(".h5")
+        with open(path, "rb") as f:
+            self.weights = [np.load(f)]
+
+
+def _model():
+    rng = np.random.default_rng(0)
+    return FakeModel([
+        rng.standard_normal((64, 32)).astype(np.float32),
+        np.arange(10, dtype=np.int64),
+    ])
+
+
+@pytest.mark.parametrize("codec,tolerance", [("float16", 1e-3), ("bfloat16", 1e-2)])
+def test_reduced_precision_round_trip(tmp_path, codec, tolerance):
+    model = _model()
+    path = str(tmp_path / f"weights.{get_codec(codec).extension}")
+    save_weights(model, path, codec)
+    loaded = FakeModel([np.zeros_like(w) for w in model.weights])
+    load_weights(loaded, path, codec)
+    np.testing.assert_allclose(
+        loaded.weights[0], model.weights[0], rtol=tolerance, atol=tolerance)
+    # Integer weights are stored as they are
+    np.testing.assert_array_equal(loaded.weights[1], model.weights[1])
+
+
+def test_bfloat16_rounding():
+    values = np.array([1.0, -2.5, 1 + 2 ** -8, 1 + 3 * 2 ** -8, np.inf, np.nan],
+                      dtype=np.float32)
+    rounded = from_bfloat16(to_bfloat16(values))
+    # Ties are rounded to the nearest even
+    np.testing.assert_array_equal(
+        rounded[:5], np.array([1.0, -2.5, 1.0, 1 + 2 ** -6, np.inf], dtype=np.float32))
+    assert np.isnan(rounded[5])
+
+
+def test_zstd_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    model = _model()
+    path = str(tmp_path / "weights.h5.zst")
+    save_weights(model, path, "h5+zstd")
+    loaded = FakeModel([])
+    load_weights(loaded, path, "h5+zstd")
+    np.testing.assert_array_equal(loaded.weights[0], model.weights[0])
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("gzip")
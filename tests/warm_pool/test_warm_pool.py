@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import textwrap
+
+import pytest
+
+from scoach import config, warm_pool
+from scoach.warm_pool import WarmInterpreterPool, WarmPoolUnavailable
+
+
+def _run(pool: WarmInterpreterPool, script_path: str):
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+    try:
+        return_code = pool.run(script_path, stdout_write, stderr_write)
+    finally:
+        os.close(stdout_write)
+        os.close(stderr_write)
+    with open(stdout_read) as stdout, open(stderr_read) as stderr:
+        return return_code, stdout.read(), stderr.read()
+
+
+def test_runs_scripts_in_fresh_children(tmp_path):
+    script = tmp_path / "train.py"
+    script.write_text(textwrap.dedent("""
+        import os
+        import sys
+        print("epoch 1")
+        print("warning", file=sys.stderr)
+        print(os.getpid())
+        sys.exit(3)
+    """))
+    pool = WarmInterpreterPool()
+    first = _run(pool, str(script))
+    second = _run(pool, str(script))
+    assert first[0] == second[0] == 3
+    assert first[1].startswith("epoch 1\n")
+    assert first[2] == "warning\n"
+    # Each run gets its own process
+    assert first[1] != second[1]
+
+
+def test_reports_uncaught_exceptions(tmp_path):
+    script = tmp_path / "train.py"
+    script.write_text("raise ValueError('bad config')\n")
+    return_code, _, stderr = _run(WarmInterpreterPool(), str(script))
+    assert return_code == 1
+    assert "ValueError: bad config" in stderr
+
+
+def test_output_of_preloaded_modules_is_not_the_handshake(tmp_path, monkeypatch):
+    script = tmp_path / "train.py"
+    script.write_text("print('trained')\n")
+    # Prints the Zen of Python when imported
+    monkeypatch.setattr(warm_pool, "_preload_modules", lambda: ["this"])
+    assert _run(WarmInterpreterPool(), str(script))[:2] == (0, "trained\n")
+
+
+def test_failed_starts_are_retried(tmp_path, monkeypatch):
+    script = tmp_path / "train.py"
+    script.write_text("print('trained')\n")
+    pool = WarmInterpreterPool()
+    monkeypatch.setattr(sys, "executable", shutil.which("false"))
+    with pytest.raises(WarmPoolUnavailable):
+        _run(pool, str(script))
+    monkeypatch.undo()
+    assert _run(pool, str(script))[:2] == (0, "trained\n")
+
+
+def test_pinned_settings_are_not_replaced_by_the_config_file(monkeypatch):
+    monkeypatch.setattr(config, "_pinned", config.Config())
+    assert "scoach.models" not in warm_pool._preload_modules()